@@ -1,6 +1,9 @@
 import google.generativeai as genai
 import os
 
+from engine import Engine, Executor, Planner, from_router
+from model_router import ModelRouter
+
 # 1. Configure Gemini
 gemini_api_key =  os.environ["GEMINI_API_KEY"]
 genai.configure(api_key=gemini_api_key)
@@ -16,11 +19,6 @@ Your job:
 - Output steps as a numbered list
 """
 
-planner = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=PLANNER_PROMPT
-)
-
 # -------- Executor Agent --------
 EXECUTOR_PROMPT = """
 You are an execution agent.
@@ -30,28 +28,20 @@ Your job:
 - Be precise and concise
 """
 
-executor = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=EXECUTOR_PROMPT
-)
+# -------- Model Routing --------
+# The planner and simple steps run on the light model; there is no critic,
+# so nothing escalates and longer steps stay on the full model.
+router = ModelRouter(genai, {"planner": PLANNER_PROMPT, "executor": EXECUTOR_PROMPT})
 
+# -------- Pipeline --------
+# Plan, then execute every step once; no critic
+pipeline = Engine(Planner(from_router(router, "planner")), Executor(from_router(router, "executor")), router=router)
 
-def run_multi_agent_system(task: str):
-
-    # 1. Planning
-    plan = planner.generate_content(task).text  #(like response.text from planner response object)
-    print("\n🧠 PLAN:\n", plan)
 
-    # 2. Execution
-    steps = [line for line in plan.split("\n") if line.strip().startswith(tuple("123456789"))]
-
-    results = []
-    for step in steps:
-        print(f"\n⚙️ Executing: {step}")
-        result = executor.generate_content(step).text
-        results.append(result)
-
-    return "\n\n".join(results)
+def run_multi_agent_system(task: str):
+    run = pipeline.run(task)
+    print("\n🔀 Routing:", router.stats())
+    return run.text
 
 
 if __name__ == "__main__":
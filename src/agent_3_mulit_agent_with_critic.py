@@ -1,6 +1,10 @@
 import google.generativeai as genai
 import os
 
+from engine import Critic, Engine, Executor, Planner, from_router
+from model_router import ModelRouter
+from response_parser import Verdict
+
 # 1. Configure Gemini
 gemini_api_key =  os.environ["GEMINI_API_KEY"]
 genai.configure(api_key=gemini_api_key)
@@ -17,11 +21,6 @@ Your job:
 - Output steps as a numbered list
 """
 
-planner = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=PLANNER_PROMPT
-)
-
 # -------- Executor Agent --------
 EXECUTOR_PROMPT = """
 You are an execution agent.
@@ -31,11 +30,6 @@ Your job:
 - Be precise and concise
 """
 
-executor = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=EXECUTOR_PROMPT
-)
-
 # -------- Critic Agent --------
 CRITIC_PROMPT = """
 You are a critic agent.
@@ -50,44 +44,42 @@ Your job:
   - or CRITIQUE with bullet points
 """
 
-critic = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=CRITIC_PROMPT
+# -------- Model Routing --------
+# The run-level review is a short checklist verdict, so the critic runs on the
+# light model, as do the planner and simple steps.
+router = ModelRouter(
+    genai,
+    {"planner": PLANNER_PROMPT, "executor": EXECUTOR_PROMPT, "critic": CRITIC_PROMPT},
 )
 
-def critique_output(output: str):
-    return critic.generate_content(output).text
+# -------- Pipeline --------
+# Every step is executed once; the critic reviews the combined output at the end
+pipeline = Engine(
+    Planner(from_router(router, "planner")),
+    Executor(from_router(router, "executor")),
+    Critic(
+        from_router(router, "critic"),
+        parse=lambda text: Verdict(passed="PASS" in text, critique=text, raw=text),
+        scope="run",
+    ),
+    router=router,
+)
 
 
  # Run the multi-agent system
 def run_multi_agent_system(task: str):
+    run = pipeline.run(task)
+    print("\n🔀 Routing:", router.stats())
+    if run.verdict is None:
+        # The budget ran out before the critique
+        return run.text
 
-    # 1. Planning
-    print("Planning the task...")
-    plan = planner.generate_content(task).text  #(like response.text from planner response object)
-    print("\n🧠 PLAN:\n", plan)
-
-    # 2. Execution
-    print("Executing the plan...")
-    steps = [line for line in plan.split("\n") if line.strip().startswith(tuple("123456789"))]
-
-    results = []
-    for step in steps:
-        print(f"\n⚙️ Executing: {step}")
-        result = executor.generate_content(step).text
-        results.append(result)
-
-    # 3. Critique
-    print("Critiquing the output...")
-    critique_output_text = critique_output("\n\n".join(results))
-    print("\n🧐 CRITIQUE:\n", critique_output_text)    
-
-    if "PASS" in critique_output_text: 
+    if run.verdict.passed:
         print("Output passed the critique.")
-        return "\n\n".join(results)
+        return run.text
     else:
         print("Output did not pass the critique.")
-        return "Output did not pass the critique. Please refine below points and try again.".join(critique_output_text)
+        return "Output did not pass the critique. Please refine below points and try again.\n" + run.verdict.critique
 
 if __name__ == "__main__":
     output = run_multi_agent_system(
@@ -1,6 +1,10 @@
 import google.generativeai as genai
 import os
 
+from engine import Critic, Engine, EnginePolicy, Executor, Planner, from_router
+from model_router import ModelRouter
+from response_parser import Verdict
+
 # 1. Configure Gemini
 gemini_api_key =  os.environ["GEMINI_API_KEY"]
 genai.configure(api_key=gemini_api_key)
@@ -15,11 +19,6 @@ Your job:
 - Output steps as a numbered list
 """
 
-planner = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=PLANNER_PROMPT
-)
-
 # -------- Executor Agent --------
 EXECUTOR_PROMPT = """
 You are an execution agent.
@@ -29,11 +28,6 @@ Your job:
 - Be precise and concise
 """
 
-executor = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=EXECUTOR_PROMPT
-)
-
 # -------- Critic Agent --------
 CRITIC_PROMPT = """
 You are a critic agent.
@@ -48,39 +42,20 @@ Your job:
   - or CRITIQUE with bullet points
 """
 
-critic = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=CRITIC_PROMPT
+# -------- Model Routing --------
+# Planner, critic and simple steps start on the light model; a step escalates
+# to the full model after the critic rejects it.
+router = ModelRouter(
+    genai,
+    {"planner": PLANNER_PROMPT, "executor": EXECUTOR_PROMPT, "critic": CRITIC_PROMPT},
 )
 
 
-# Multi-Agent Fully Autonomous System
-def autonomous_multi_agent_run(goal: str, max_retries=3):
-    plan = planner.generate_content(goal).text
-    print("\n🧠 PLAN:\n", plan)
-
-    steps = [s for s in plan.split("\n") if s.strip().startswith(tuple("123456789"))]
-
-    final_output = []
-
-    for step in steps:
-        print(f"\n⚙️ Step: {step}")
-        for attempt in range(max_retries):
-            result = executor.generate_content(step).text
-            critique = critic.generate_content(result).text
-
-            print(f"\nAttempt {attempt+1}")
-            print("Result:", result)
-            print("Critic:", critique)
-
-            if critique.strip().startswith("PASS"):
-                final_output.append(result)
-                break
-            else:
-                # Feed critique back to executor (not rewrite)
-                step = f"""
+def critic_feedback(state, answer, critique):
+    # Feed critique back to executor (not rewrite)
+    return f"""
                 Original task:
-                {step}
+                {state.prompt}
 
                 Critic feedback:
                 {critique}
@@ -88,7 +63,23 @@ def autonomous_multi_agent_run(goal: str, max_retries=3):
                 Improve your execution.
                 """
 
-    return "\n\n".join(final_output)
+
+# Multi-Agent Fully Autonomous System
+def autonomous_multi_agent_run(goal: str, max_retries=3):
+    pipeline = Engine(
+        Planner(from_router(router, "planner")),
+        Executor(from_router(router, "executor")),
+        Critic(
+            from_router(router, "critic"),
+            parse=lambda text: Verdict(passed=text.strip().startswith("PASS"), critique=text, raw=text),
+        ),
+        policy=EnginePolicy(max_retries=max_retries, critique_feedback=critic_feedback),
+        router=router,
+    )
+    run = pipeline.run(goal)
+
+    print("\n🔀 Routing:", router.stats())
+    return run.text
 
 
 if __name__ == "__main__":
@@ -1,12 +1,19 @@
 import google.generativeai as genai
-import json
 import math
 import os
 
+from engine import Engine, EnginePolicy, Executor, SingleStepPlanner, from_router
+from model_router import MODEL, ModelRouter
+from response_parser import JSON_MODE_INSTRUCTION, PARSE_STATS, json_mode_config, parse_executor_response
+from tool_registry import ToolRegistry
+
 # 1. Configure Gemini
 gemini_api_key =  os.environ["GEMINI_API_KEY"]
 genai.configure(api_key=gemini_api_key)
 
+# Ask Gemini for schema-constrained JSON instead of free text (AGENT_JSON_MODE=1)
+USE_JSON_MODE = os.environ.get("AGENT_JSON_MODE") == "1"
+
 # -------- Tools --------
 def calculator(expression: str):
     """Evaluates a mathematical expression."""
@@ -17,82 +24,100 @@ def word_count(text: str):
     return str(len(text.split()))
 
 
-TOOLS = {
-    "calculator": calculator,
-    "word_count": word_count,
-}
+# Both tools are pure, so repeated calls with the same input are served from the cache
+TOOLS = ToolRegistry()
+TOOLS.register(
+    "calculator",
+    calculator,
+    description="Evaluates mathematical expressions",
+    input_schema={"type": "string", "description": "a string mathematical expression"},
+    pure=True,
+)
+TOOLS.register(
+    "word_count",
+    word_count,
+    description="Counts words in a sentence",
+    input_schema={"type": "string", "description": "a string of text"},
+    pure=True,
+)
 
 # -------- Agent --------
-SYSTEM_PROMPT = """
+SYSTEM_PROMPT = f"""
 You are an autonomous agent.
 
 You have access to the following tools:
 
-1. calculator
-   - description: Evaluates mathematical expressions
-   - input: a string mathematical expression
-
-2. word_count
-   - description: Counts words in a sentence
-   - input: a string of text
+{TOOLS.describe()}
 
 When you need a tool, respond EXACTLY in JSON:
-{
+{{
   "action": "tool_name",
   "input": "tool input"
-}
+}}
 
 If no tool is needed, respond with:
 FINAL ANSWER: <your answer>
 """
 
-model = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=SYSTEM_PROMPT
+# There is no critic here to catch a weak answer and escalate, so even short
+# tasks stay on the full model; the router only shares the model and counts calls.
+router = ModelRouter(
+    genai,
+    {"executor": SYSTEM_PROMPT + (JSON_MODE_INSTRUCTION if USE_JSON_MODE else "")},
+    policy={"executor_simple": MODEL},
+    generation_configs={"executor": json_mode_config() if USE_JSON_MODE else None},
 )
 
 
-def run_agent(task: str, max_steps=5):
-    context = task
-
-    for step in range(max_steps):
-        print(f"\n--- Step {step+1} ---")
-        response = model.generate_content(context).text
-        print("LLM:", response)
-
-        if response.startswith("FINAL ANSWER"):
-            return response
-
-        try:
-            tool_request = json.loads(response)
-            tool_name = tool_request["action"]
-            tool_input = tool_request["input"]
-
-            if tool_name not in TOOLS:
-                context = f"""
-                Error:
-                The tool '{tool_name}' is not available.
-                Available tools are: {', '.join(TOOLS.keys())}
-                Please choose a valid tool or finish without using a tool.
-                """
-                continue
-
-            print(f"🔧 Using tool: {tool_name}")
-            observation = TOOLS[tool_name](tool_input)
-            print(f"📌 Observation: {observation}")
-
-            context = f"""
-            Tool result:
-            {observation}
-
-            Continue reasoning.
+def tool_feedback(state, tool, observation):
+    return f"""
+        Tool result:
+        {observation}
+
+        Continue reasoning.
+        """
+
+
+def unknown_tool_feedback(state, tool, available):
+    return f"""
+            Error:
+            The tool '{tool}' is not available.
+            Available tools are: {', '.join(available)}
+            Please choose a valid tool or finish without using a tool.
             """
-        except json.JSONDecodeError:
-            return "❌ Invalid agent response format"
 
+
+def failed_output(state):
+    if state.failure == "invalid":
+        return "❌ Invalid agent response format"
     return "❌ Agent did not finish."
 
 
+def run_agent(task: str, max_steps=5):
+    # One step (the task itself), looping through tools until a final answer
+    pipeline = Engine(
+        SingleStepPlanner(),
+        Executor(from_router(router, "executor"), parse=parse_executor_response),
+        tools=TOOLS,
+        router=router,
+        policy=EnginePolicy(
+            max_retries=max_steps,
+            retry_invalid=False,
+            failed_output=failed_output,
+            tool_feedback=tool_feedback,
+            unknown_tool_feedback=unknown_tool_feedback,
+        ),
+    )
+    run = pipeline.run(task)
+
+    print("🔧 Tool cache:", TOOLS.stats())
+    print("📊 Parse stats:", PARSE_STATS.as_dict())
+    print("🔀 Routing:", router.stats())
+    if run.passed:
+        return f"FINAL ANSWER: {run.text}"
+    return run.text
+
+
 if __name__ == "__main__":
     print(
         run_agent(
@@ -1,11 +1,19 @@
 import google.generativeai as genai
-import json
 import os
 
+from checkpoint import CheckpointStore
+from engine import Critic, Engine, EnginePolicy, Executor, Planner, from_router
+from model_router import ModelRouter
+from response_parser import JSON_MODE_INSTRUCTION, PARSE_STATS, json_mode_config, parse_executor_response
+from tool_registry import ToolRegistry
+
 # 1. Configure Gemini
 gemini_api_key =  os.environ["GEMINI_API_KEY"]
 genai.configure(api_key=gemini_api_key)
 
+# Ask Gemini for schema-constrained JSON instead of free text (AGENT_JSON_MODE=1)
+USE_JSON_MODE = os.environ.get("AGENT_JSON_MODE") == "1"
+
 # -------- Tools --------
 def calculator(expression: str):
     return str(eval(expression))
@@ -14,11 +22,23 @@ def calculator(expression: str):
 def word_count(text: str):
     return str(len(text.split()))
 
-# Mapping tool names to functions
-TOOLS = {
-    "calculator": calculator,
-    "word_count": word_count
-}
+# Mapping tool names to functions. Both are pure, so their results are cached
+# across retries, steps and goals.
+TOOLS = ToolRegistry()
+TOOLS.register(
+    "calculator",
+    calculator,
+    description="Evaluates mathematical expressions",
+    input_schema={"type": "string", "description": "a string mathematical expression"},
+    pure=True,
+)
+TOOLS.register(
+    "word_count",
+    word_count,
+    description="Counts words in a sentence",
+    input_schema={"type": "string", "description": "a string of text"},
+    pure=True,
+)
 
 # -------- Planner Agent --------
 PLANNER_PROMPT = """
@@ -30,11 +50,6 @@ Your job:
 - Output steps as a numbered list
 """
 
-planner = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=PLANNER_PROMPT
-)
-
 # -------- Executor Agent --------
 EXECUTOR_PROMPT = f"""
 You are an execution agent.
@@ -48,11 +63,8 @@ When using a tool, respond in JSON:
 Otherwise respond:
 FINAL ANSWER: <answer>
 """
-
-executor = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=EXECUTOR_PROMPT
-)
+if USE_JSON_MODE:
+    EXECUTOR_PROMPT += JSON_MODE_INSTRUCTION
 
 
 # -------- Critic Agent --------
@@ -76,75 +88,80 @@ Your job:
 Do NOT suggest tools unless the goal explicitly requires them.
 """
 
-critic = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=CRITIC_PROMPT
+# -------- Model Routing --------
+# Planner, critic and simple steps start on the light model; a step escalates
+# to the full model after a critique or an unclear verdict.
+router = ModelRouter(
+    genai,
+    {"planner": PLANNER_PROMPT, "executor": EXECUTOR_PROMPT, "critic": CRITIC_PROMPT},
+    generation_configs={"executor": json_mode_config() if USE_JSON_MODE else None},
 )
 
-# Multi-Agent Full Stack System
-def run_full_agent(goal: str, max_retries=3):
-    plan = planner.generate_content(goal).text
-    print("\n🧠 PLAN:\n", plan)
-
-    steps = [s for s in plan.split("\n") if s.strip().startswith(tuple("123456789"))]
-    outputs = []
-
-    for step in steps:
-        context = step
-        for _ in range(max_retries):
-            response = executor.generate_content(context).text
-            print("\nExecutor:", response)
+# -------- Checkpoints --------
+checkpoints = CheckpointStore.from_env()  # resume with resume_full_agent(run_id); see checkpoint.py
 
-            if response.startswith("FINAL ANSWER"):
-                answer = response.replace("FINAL ANSWER:", "").strip()
-
-                critique = critic.generate_content(f"""
+# -------- Pipeline --------
+def critic_prompt(run, state, answer):
+    return f"""
                             GOAL: 
-                            {goal}
+                            {run.goal}
 
                             ANSWER:
                             {answer}
-                            """).text
-                
-                print("Critic:", critique)
-
-                if critique.startswith("PASS"):
-                    outputs.append(answer)
-                    break
-                else:
-                    context = f"""
+                            """
+
+
+def critique_feedback(state, answer, critique):
+    return f"""
                                 {answer}
                                 Improve based on critique:
                                 {critique}
                                 """
-            else:
-                try:
-                    tool_req = json.loads(response)
-                    tool = tool_req["action"]
-
-                    if tool not in TOOLS:
-                        context = f"""
-                                    ERROR: Tool '{tool}' not available.
-                                    Available tools: {list(TOOLS.keys())}
-                                    """
-                        continue
-
-                    observation = TOOLS[tool](tool_req["input"])
-                    context = f"Tool result: {observation}"
-
-                except Exception as e:
-                    context = f"""
-                            Original task:
-                            {step}
 
-                            An error occurred while handling a tool request:
-                            {e}
 
-                            If a tool is not required, answer directly.
-                            If a tool is required, issue a correct tool request.
+def invalid_feedback(state, parsed):
+    # Neither a final answer nor a usable tool request: this retry is format-induced
+    return f"""
+                            Original task:
+                            {state.step}
+
+                            Your previous response could not be parsed ({parsed.error}).
+                            Respond either with FINAL ANSWER: <answer>
+                            or with a JSON tool request: {{"action": "<tool_name>", "input": "<input>"}}
                             """
 
-    return "\n\n".join(outputs)
+
+# Multi-Agent Full Stack System
+def make_pipeline(max_retries=3):
+    return Engine(
+        Planner(from_router(router, "planner")),
+        Executor(from_router(router, "executor"), parse=parse_executor_response),
+        Critic(from_router(router, "critic"), prompt=critic_prompt),
+        tools=TOOLS,
+        policy=EnginePolicy(
+            max_retries=max_retries,
+            critique_feedback=critique_feedback,
+            invalid_feedback=invalid_feedback,
+        ),
+        router=router,
+        checkpoints=checkpoints,
+    )
+
+
+def report(run):
+    print("\n🔧 Tool cache:", TOOLS.stats())
+    print("📊 Parse stats:", PARSE_STATS.as_dict())
+    print("🔀 Routing:", router.stats())
+    print("💰 Budget:", run.budget.stats())
+    return run.text
+
+
+def run_full_agent(goal: str, max_retries=3, run_id=None, budget=None):
+    return report(make_pipeline(max_retries).run(goal, run_id, budget))
+
+
+def resume_full_agent(run_id: str, max_retries=3, budget=None):
+    return report(make_pipeline(max_retries).resume(run_id, budget))
 
 
 if __name__ == "__main__":
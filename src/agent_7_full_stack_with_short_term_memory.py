@@ -2,16 +2,24 @@ import google.generativeai as genai
 import json
 import os
 
+from checkpoint import CheckpointStore
+from engine import Critic, Engine, EnginePolicy, Planner, SessionExecutor, ShortTermRecall, from_router
+from llm_session import SESSION_STATS
+from model_router import ModelRouter
+from prompt_builder import PROMPT_STATS, build_prompt
+from response_parser import PARSE_STATS, parse_executor_response
+
 # ================== CONFIG ==================
 gemini_api_key =  os.environ["GEMINI_API_KEY"]
 genai.configure(api_key=gemini_api_key)
-MODEL = "gemini-2.5-flash"
 MAX_RETRIES = 3
+PROMPT_TOKEN_BUDGET = 1500  # per executor call; older observations are compacted to fit
+MEMORY_WINDOW = 5  # previous step outputs kept verbatim in short-term memory
+MEMORY_TOKEN_BUDGET = 600  # max tokens the PREVIOUS STEPS block may add to a prompt
+USE_CHAT_SESSIONS = os.environ.get("AGENT_CHAT_SESSIONS") == "1"  # retries continue a chat (history is re-billed)
 
 # ================== PLANNER ==================
-planner = genai.GenerativeModel(
-    model_name=MODEL,
-    system_instruction="""
+PLANNER_PROMPT = """
 You are a planning agent.
 
 Your job:
@@ -24,16 +32,14 @@ Output format:
 2. Step two
 ...
 """
-)
 
 # ================== EXECUTOR ==================
-executor = genai.GenerativeModel(
-    model_name=MODEL,
-    system_instruction="""
+EXECUTOR_PROMPT = """
 You are an execution agent.
 
 Rules:
-- You are given a GOAL, a CURRENT STEP, and OBSERVATIONS
+- You are given a GOAL, PREVIOUS STEPS, a CURRENT STEP, and OBSERVATIONS
+- PREVIOUS STEPS are answers you already gave; build on them, do not repeat them
 - Use OBSERVATIONS only as feedback, not as a new task
 - If the task can be answered directly, respond with:
 
@@ -43,12 +49,9 @@ FINAL ANSWER:
 - Do NOT assume tool usage unless explicitly required
 - If an error occurred previously, re-evaluate calmly
 """
-)
 
 # ================== CRITIC ==================
-critic = genai.GenerativeModel(
-    model_name=MODEL,
-    system_instruction="""
+CRITIC_PROMPT = """
 You are a critic agent.
 
 You will receive:
@@ -68,86 +71,72 @@ or
 CRITIQUE:
 - specific issue
 """
-)
-
-# ================== ORCHESTRATOR ==================
-def run_agent_with_short_memory(goal: str):
-    print("\n🎯 GOAL:\n", goal)
-
-    plan_text = planner.generate_content(goal).text
-    print("\n🧠 PLAN:\n", plan_text)
-
-    steps = [
-        line for line in plan_text.split("\n")
-        if line.strip().startswith(tuple("123456789"))
-    ]
-
-    final_outputs = []
-
-    for step in steps:
-        print(f"\n➡️ EXECUTING STEP: {step}")
 
-        agent_state = {
-            "goal": goal,
-            "step": step,
-            "observations": [],
-            "attempts": 0
-        }
-
-        while agent_state["attempts"] < MAX_RETRIES:
-            agent_state["attempts"] += 1
-
-            response = executor.generate_content(f"""
-                                                    GOAL:
-                                                    {agent_state['goal']}
-
-                                                    CURRENT STEP:
-                                                    {agent_state['step']}
-
-                                                    OBSERVATIONS:
-                                                    {agent_state['observations']}
-
-                                                    Decide next action.
-                                                    """).text.strip()
-
-            print(f"\nExecutor Attempt {agent_state['attempts']}:\n{response}")
-
-            # ---- Final Answer Path ----
-            if response.startswith("FINAL ANSWER"):
-                answer = response.replace("FINAL ANSWER:", "").strip()
+# ================== MODEL ROUTING ==================
+# DEFAULT_POLICY: planner, critic and simple steps start on the light model and a
+# step escalates to the full model after a critique or an unclear verdict.
+router = ModelRouter(
+    genai,
+    {"planner": PLANNER_PROMPT, "executor": EXECUTOR_PROMPT, "critic": CRITIC_PROMPT},
+)
 
-                critique = critic.generate_content(f"""
-                                                    GOAL:
-                                                    {goal}
+# ================== CHECKPOINTS ==================
+checkpoints = CheckpointStore.from_env()  # resume with resume_agent_with_short_memory(run_id); see checkpoint.py
 
-                                                    Current Step:
-                                                    {agent_state['step']}
+# ================== ORCHESTRATOR ==================
+short_term = ShortTermRecall(max_items=MEMORY_WINDOW, max_tokens=MEMORY_TOKEN_BUDGET)
+
+
+def executor_sections(run, state):
+    previous_steps = short_term.block(run, state)
+
+    sections = [("GOAL", run.goal)]
+    if previous_steps:
+        sections.append(("PREVIOUS STEPS", previous_steps))
+    sections.append(("CURRENT STEP", state.step))
+    return sections
+
+
+pipeline = Engine(
+    Planner(from_router(router, "planner")),
+    SessionExecutor(
+        lambda run, state: router.model_for("executor", state.step),
+        executor_sections,
+        use_chat=USE_CHAT_SESSIONS,
+        token_budget=PROMPT_TOKEN_BUDGET,
+        footer="Decide next action.",
+        parse=lambda text: parse_executor_response(text, allow_tools=False),  # this agent has no tools
+        record_latency=router.record_latency,
+    ),
+    Critic(
+        from_router(router, "critic"),
+        prompt=lambda run, state, answer: build_prompt(
+            [("GOAL", run.goal), ("Current Step", state.step), ("ANSWER", answer)]
+        ),
+    ),
+    memory=short_term,
+    policy=EnginePolicy(max_retries=MAX_RETRIES, failed_output=lambda state: "❌ Step failed after retries."),
+    router=router,
+    checkpoints=checkpoints,
+)
 
-                                                    ANSWER:
-                                                    {answer}
-                                                    """).text.strip()
 
-                print("\n🧐 CRITIC:", critique)
+def report(run):
+    print("\n📊 Parse stats:", PARSE_STATS.as_dict())
+    print("📏 Prompt stats:", PROMPT_STATS.as_dict())
+    print("🧠 Short-term memory:", run.memory.stats())
+    print("💬 Session stats:", SESSION_STATS.as_dict())
+    print("🔀 Routing:", router.stats())
+    print("💰 Budget:", run.budget.stats())
+    return run.text
 
-                if critique == "PASS":
-                    final_outputs.append(answer)
-                    break
-                else:
-                    agent_state["observations"].append(critique)
-                    continue
 
-            # ---- Invalid / Unexpected Output ----
-            else:
-                agent_state["observations"].append(
-                    "Executor did not provide FINAL ANSWER. Retry with clarity."
-                )
+def run_agent_with_short_memory(goal: str, run_id=None, budget=None):
+    return report(pipeline.run(goal, run_id, budget))
 
-        else:
-            final_outputs.append(
-                "❌ Step failed after retries."
-            )
 
-    return "\n\n".join(final_outputs)
+def resume_agent_with_short_memory(run_id: str, budget=None):
+    return report(pipeline.resume(run_id, budget))
 
 
 # ================== RUN ==================
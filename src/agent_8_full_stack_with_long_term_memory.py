@@ -1,77 +1,177 @@
-import faiss
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import google.generativeai as genai
-from datetime import datetime
+import atexit
 import os
+import threading
+
+from checkpoint import CheckpointStore
+from compact_memory import MemoryStore, make_vector_index
+from embedding_cache import EmbeddingCache
+from engine import Critic, Engine, EnginePolicy, LongTermRecall, Planner, SessionExecutor, from_router
+from hybrid_retrieval import BM25Index, reciprocal_rank_fusion
+from llm_session import SESSION_STATS
+from model_router import ModelRouter
+from shared_memory_index import SegmentFull, SharedMemoryIndex
+from write_behind import WriteBehindQueue
+from prompt_builder import PROMPT_STATS, build_prompt
+from response_parser import PARSE_STATS, parse_executor_response
 
 # ================== CONFIG ====================
 gemini_api_key =  os.environ["GEMINI_API_KEY"]
 genai.configure(api_key=gemini_api_key)
-MODEL = "gemini-2.5-flash"
 MAX_RETRIES = 3
+PROMPT_TOKEN_BUDGET = 1500  # per executor call; older observations are compacted to fit
+USE_CHAT_SESSIONS = os.environ.get("AGENT_CHAT_SESSIONS") == "1"  # retries continue a chat (history is re-billed)
 TOP_K = 3
 RELEVANCE_THRESHOLD = 0.55
-EMBED_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+LEXICAL_MIN_SCORE = 1.0  # BM25 score a keyword match needs to count (filters matches on common words)
+LEXICAL_RELATIVE_CUTOFF = 0.5  # ...and at least this fraction of the best keyword match
+CANDIDATES_PER_RETRIEVER = 10  # each retriever proposes this many before fusion picks TOP_K
+VECTOR_QUANTIZATION = os.environ.get("AGENT_VECTOR_QUANTIZATION", "float32")  # float32, fp16 or int8
+SHARED_MEMORY_PATH = os.environ.get("AGENT_SHARED_MEMORY")  # mmap segment shared by all workers on the box
+SHARED_MEMORY_CAPACITY = int(os.environ.get("AGENT_SHARED_MEMORY_CAPACITY", "100000"))  # set when the segment is created
+LEXICAL_SEARCH = os.environ.get("AGENT_LEXICAL_SEARCH", "1") == "1"  # BM25 keyword matches next to vector search
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBED_MODEL = SentenceTransformer(EMBED_MODEL_NAME)
+EMBEDDING_CACHE_PATH = os.environ.get("AGENT_EMBEDDING_CACHE", ".embedding_cache.sqlite3")  # "" disables the disk tier
+WRITE_BEHIND = os.environ.get("AGENT_WRITE_BEHIND", "1") == "1"  # learn answers on a background thread
+READ_YOUR_WRITES = os.environ.get("AGENT_READ_YOUR_WRITES") == "1"  # retrieval waits for queued memories
+WRITE_BEHIND_BATCH = 16
+WRITE_BEHIND_INTERVAL = 2.0  # max seconds a learned answer waits before it is written
 
 # ================= MEMORY STORE =================
 dimension = 384  # embedding size of MiniLM
-index = faiss.IndexFlatIP(dimension)
-memory_store = []  # holds metadata + content
+shared_index = None
+
+if SHARED_MEMORY_PATH:
+    # The segment stores float32 vectors; a quantized layout would need a new segment format
+    if VECTOR_QUANTIZATION != "float32":
+        raise ValueError(
+            f"AGENT_VECTOR_QUANTIZATION={VECTOR_QUANTIZATION} is not supported with AGENT_SHARED_MEMORY "
+            "(shared segments are float32)"
+        )
+    # Every worker maps the same segment: one copy of the index per box, appends visible to all.
+    # Capacity only applies when this worker creates the segment; once full, new memories are dropped.
+    shared_index = SharedMemoryIndex(SHARED_MEMORY_PATH, dimension, capacity=SHARED_MEMORY_CAPACITY)
+    index = memory_store = shared_index
+else:
+    index = make_vector_index(dimension, VECTOR_QUANTIZATION)
+    memory_store = MemoryStore()  # holds metadata + content in compact columns
+
+# Keyword index over the same memories, keyed by position in memory_store. It is per process:
+# with a shared segment every worker still holds its own postings (roughly the text of every
+# memory again), so on boxes with many workers AGENT_LEXICAL_SEARCH=0 keeps only the shared copy.
+lexical_index = BM25Index()
+memory_lock = threading.Lock()  # the write-behind thread and the orchestrator both touch the indexes
+
+# Repeated texts (seed memories, recurring goals, identical answers) are encoded only once
+embedding_cache = EmbeddingCache(EMBED_MODEL_NAME, EMBED_MODEL.encode, path=EMBEDDING_CACHE_PATH or None)
+atexit.register(embedding_cache.close)
 
 def embed(text):
-    vec = EMBED_MODEL.encode([text])[0]
-    return vec / np.linalg.norm(vec)
+    return embedding_cache.embed(text)
+
+
+def sync_lexical_index():
+    # Memories are appended in id order, so anything past the indexed count is new
+    # (including memories other workers appended to a shared segment)
+    if not LEXICAL_SEARCH:
+        return
+    for memory_id in range(len(lexical_index), len(memory_store)):
+        lexical_index.add(memory_id, memory_store.content(memory_id))
+
+
+def store_memories(items):
+    # Embedding happens outside the lock; only the index inserts are serialized
+    vectors = embedding_cache.embed_many([content for content, _ in items])
+    with memory_lock:
+        if shared_index is not None:
+            written = 0
+            try:
+                for (content, topic), vector in zip(items, vectors):
+                    shared_index.append(vector.astype("float32"), content, topic)
+                    written += 1
+            except SegmentFull as e:
+                # A full segment must not take down the run; the answers are just not remembered
+                print(f"⚠️ {e}; dropping {len(items) - written} memories")
+        else:
+            index.add(np.array(vectors).astype("float32"))
+            for content, topic in items:
+                memory_store.append(content, topic)
+        sync_lexical_index()
 
 
 def store_memory(content, topic="general"):
-    vector = embed(content)
-    index.add(np.array([vector]).astype("float32"))
-    memory_store.append({
-        "content": content,
-        "topic": topic,
-        "timestamp": str(datetime.now())
-    })
+    store_memories([(content, topic)])
+
+
+# Learned answers are embedded and inserted in batches off the critical path
+memory_writer = WriteBehindQueue(store_memories, batch_size=WRITE_BEHIND_BATCH, flush_interval=WRITE_BEHIND_INTERVAL)
+atexit.register(memory_writer.close)
+
+def learn_memory(content, topic="learned_answer"):
+    if WRITE_BEHIND:
+        memory_writer.submit((content, topic))
+    else:
+        store_memory(content, topic)
 
 
 def retrieve_relevant_memories(goal):
+    # Flush first: with an empty store, the only memories may still be queued
+    if READ_YOUR_WRITES:
+        memory_writer.flush()
+
     if len(memory_store) == 0:
         return []
 
     goal_vec = embed(goal)
-    scores, ids = index.search(np.array([goal_vec]).astype("float32"), TOP_K)
 
-    memories = []
+    with memory_lock:
+        sync_lexical_index()
+        candidates = min(len(memory_store), CANDIDATES_PER_RETRIEVER)
+        scores, ids = index.search(np.array([goal_vec]).astype("float32"), candidates)
 
-    # Finding out relevant memories based on cosine similarity scores from Embedded Goal using Faiss. Only consider those above a certain relevance threshold.
-    for score, idx in zip(scores[0], ids[0]):
-        if score > RELEVANCE_THRESHOLD:
-            memories.append(memory_store[idx]["content"])
-
-    return memories
+        # Dense candidates: cosine similarity from the embedded goal, above the relevance threshold
+        dense = [int(idx) for score, idx in zip(scores[0], ids[0]) if idx != -1 and score > RELEVANCE_THRESHOLD]
 
+        # Lexical candidates: exact-term matches (product names, error codes) that embeddings often miss
+        lexical = []
+        if LEXICAL_SEARCH:
+            lexical = lexical_index.strong_matches(goal, candidates, LEXICAL_MIN_SCORE, LEXICAL_RELATIVE_CUTOFF)
 
-# Seed some long-term knowledge
-store_memory(
-    "Agentic AI systems rely on orchestration logic to manage planning, execution, retries, and role separation.",
-    topic="agentic_ai"
-)
+        memories = [memory_store.content(idx) for idx in reciprocal_rank_fusion([dense, lexical])[:TOP_K]]
 
-store_memory(
-    "Critic agents should evaluate output without rewriting it to avoid role leakage.",
-    topic="agent_design"
-)
+    return memories
 
 
-store_memory(
-    "Vector databases enable efficient similarity search for unstructured data, which is crucial for AI applications like recommendation systems and semantic search.",     
-    topic="vector_databases"
-)
+def seed_memories(items):
+    if shared_index is None:
+        store_memories(items)
+        return
+    # Workers starting together all see an empty segment; the count is re-checked
+    # under the segment lock so only one of them writes the seeds
+    vectors = embedding_cache.embed_many([content for content, _ in items])
+    with memory_lock:
+        shared_index.append_if_empty(
+            [(vector.astype("float32"), content, topic) for (content, topic), vector in zip(items, vectors)]
+        )
+        sync_lexical_index()
+
+
+# Seed some long-term knowledge (once per segment when workers share memory)
+if len(memory_store) == 0:
+    seed_memories([
+        ("Agentic AI systems rely on orchestration logic to manage planning, execution, retries, and role separation.",
+         "agentic_ai"),
+        ("Critic agents should evaluate output without rewriting it to avoid role leakage.",
+         "agent_design"),
+        ("Vector databases enable efficient similarity search for unstructured data, which is crucial for AI applications like recommendation systems and semantic search.",
+         "vector_databases"),
+    ])
 
 # ================= PLANNER =================
-planner = genai.GenerativeModel(
-    model_name=MODEL,
-    system_instruction="""
+PLANNER_PROMPT = """
 You are a planning agent.
 
 Use any provided MEMORY if relevant.
@@ -79,12 +179,9 @@ Use any provided MEMORY if relevant.
 Break the goal into small steps.
 Do NOT execute them.
 """
-)
 
 # ================= EXECUTOR =================
-executor = genai.GenerativeModel(
-    model_name=MODEL,
-    system_instruction="""
+EXECUTOR_PROMPT = """
 You are an execution agent.
 
 You will receive:
@@ -99,12 +196,9 @@ Answer directly with:
 FINAL ANSWER:
 <answer>
 """
-)
 
 # ================= CRITIC =================
-critic = genai.GenerativeModel(
-    model_name=MODEL,
-    system_instruction="""
+CRITIC_PROMPT = """
 You are a critic agent.
 
 You will receive GOAL, One of the STEPs of Overall Goal and ANSWER.
@@ -121,94 +215,81 @@ or
 CRITIQUE:
 - issue
 """
+
+# ================= MODEL ROUTING =================
+# DEFAULT_POLICY: planner, critic and simple steps start on the light model and a
+# step escalates to the full model after a critique or an unclear verdict.
+router = ModelRouter(
+    genai,
+    {"planner": PLANNER_PROMPT, "executor": EXECUTOR_PROMPT, "critic": CRITIC_PROMPT},
 )
 
-# ================= ORCHESTRATOR =================
-def run_agent(goal: str):
-    print("\n🎯 GOAL:\n", goal)
+# ================= CHECKPOINTS =================
+checkpoints = CheckpointStore.from_env()  # resume with resume_agent(run_id); see checkpoint.py
 
-    # ---- Long-term memory retrieval BEFORE planning ----
+# ================= ORCHESTRATOR =================
+def recall(goal):
     memories = retrieve_relevant_memories(goal)
-    memory_block = "\n".join(memories)
-
-    print("\n🧠 RELEVANT MEMORIES:\n", memory_block if memory_block else "None")
-
-    # ---- Planning with memory ----
-    plan = planner.generate_content(f"""
-                                    GOAL:
-                                    {goal}
-
-                                    MEMORY:
-                                    {memory_block}
-                                    """).text
-
-    print("\n📝 PLAN:\n", plan)
-
-    steps = [line for line in plan.split("\n") if line.strip().startswith(tuple("123456789"))]
-    outputs = []
-
-    for step in steps:
-        print(f"\n➡️ STEP: {step}")
-
-        state = {
-            "goal": goal,
-            "step": step,
-            "observations": [],
-            "attempts": 0
-        }
-
-        while state["attempts"] < MAX_RETRIES:
-            state["attempts"] += 1
-
-            response = executor.generate_content(f"""
-                                                GOAL:
-                                                {state['goal']}
-
-                                                STEP:
-                                                {state['step']}
-
-                                                OBSERVATIONS:
-                                                {state['observations']}
-                                                """).text.strip()
-
-            print(f"\nExecutor Attempt {state['attempts']}:\n{response}")
-
-            if response.startswith("FINAL ANSWER"):
-                answer = response.replace("FINAL ANSWER:", "").strip()
-
-                critique = critic.generate_content(f"""
-                                                    GOAL:
-                                                    {goal}
-
-                                                    STEP:
-                                                    {state['step']}
-
-                                                    ANSWER:
-                                                    {answer}
-                                                    """).text.strip()
-
-                print("\nCritic says:", critique)
+    print("\n🧠 RELEVANT MEMORIES:\n", "\n".join(memories) if memories else "None")
+    return memories
 
-                if critique == "PASS":
-                    outputs.append(answer)
 
-                    # Store useful knowledge back into memory
-                    store_memory(answer, topic="learned_answer")
-                    break
-                else:
-                    state["observations"].append(critique)
+def executor_sections(run, state):
+    return [("GOAL", run.goal), ("STEP", state.step)]
+
+
+pipeline = Engine(
+    # Long-term memory is retrieved BEFORE planning and goes into the planner prompt
+    Planner(
+        from_router(router, "planner"),
+        prompt=lambda run: build_prompt([("GOAL", run.goal), ("MEMORY", run.memory)]),
+    ),
+    SessionExecutor(
+        lambda run, state: router.model_for("executor", state.step),
+        executor_sections,
+        use_chat=USE_CHAT_SESSIONS,
+        token_budget=PROMPT_TOKEN_BUDGET,
+        parse=lambda text: parse_executor_response(text, allow_tools=False),  # this agent has no tools
+        record_latency=router.record_latency,
+    ),
+    Critic(
+        from_router(router, "critic"),
+        prompt=lambda run, state, answer: build_prompt([("GOAL", run.goal), ("STEP", state.step), ("ANSWER", answer)]),
+    ),
+    # Answers the critic passes are stored back into memory
+    memory=LongTermRecall(recall, learn_memory),
+    policy=EnginePolicy(max_retries=MAX_RETRIES, failed_output=lambda state: "❌ Failed after retries"),
+    router=router,
+    checkpoints=checkpoints,
+)
 
-        else:
-            outputs.append("❌ Failed after retries")
 
+def report(run):
     print ("\n🧠 Storing final output in memory for future retrieval.")
     
     print("\n📚 Current Memory Store:")
-    for memory in memory_store:
-        if memory["topic"] == "learned_answer":
+    with memory_lock:
+        for memory in memory_store.with_topic("learned_answer"):
             print("Stored memory:", memory["content"])
+    for content, topic in memory_writer.pending():
+        print("Queued memory:", content)
+
+    print("\n📊 Parse stats:", PARSE_STATS.as_dict())
+    print("📏 Prompt stats:", PROMPT_STATS.as_dict())
+    print("💬 Session stats:", SESSION_STATS.as_dict())
+    print("🔀 Routing:", router.stats())
+    print("💰 Budget:", run.budget.stats())
+    print("🧮 Embedding cache:", embedding_cache.stats())
+    print("✍️ Write-behind:", memory_writer.stats())
+    return run.text
+
+
+def run_agent(goal: str, run_id=None, budget=None):
+    return report(pipeline.run(goal, run_id, budget))
+
 
-    return "\n\n".join(outputs)
+def resume_agent(run_id: str, budget=None):
+    return report(pipeline.resume(run_id, budget))
 
 # ================= RUN =================
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+import os
+import time
+from collections import Counter
+
+from prompt_builder import count_tokens
+
+
+def _env_limit(name, cast):
+    value = os.environ.get(name)
+    return cast(value) if value else None
+
+
+class RunBudget:
+    """
+    Per-goal ceiling on LLM calls, tokens and wall time.
+
+    Orchestrators ask `allows(role, prompt)` before every model call and
+    `charge(prompt, response)` after it. Once a limit is reached every later
+    `allows` is refused and `stop_reason` says which limit it was, so the
+    caller can skip the critic or stop with the steps finished so far.
+    Tokens come from the response's usage metadata when present, otherwise
+    from the local estimate; the time limit is checked between calls and
+    cannot cut one short. A limit of None is unlimited.
+    """
+
+    def __init__(self, max_calls=None, max_tokens=None, max_seconds=None, clock=time.monotonic):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.started_at = clock()
+
+        self.calls = 0
+        self.tokens = 0
+        self.denied = Counter()  # role -> calls refused
+        self.stop_reason = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_calls=_env_limit("AGENT_MAX_CALLS", int),
+            max_tokens=_env_limit("AGENT_MAX_TOKENS", int),
+            max_seconds=_env_limit("AGENT_MAX_SECONDS", float),
+        )
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.started_at
+
+    @property
+    def stopped(self):
+        return self.stop_reason is not None
+
+    def _exceeded(self, prompt):
+        if self.max_calls is not None and self.calls >= self.max_calls:
+            return f"call budget of {self.max_calls} used"
+        if self.max_tokens is not None and self.tokens + count_tokens(prompt) > self.max_tokens:
+            return f"token budget of {self.max_tokens} used ({self.tokens} spent)"
+        if self.max_seconds is not None and self.elapsed >= self.max_seconds:
+            return f"time budget of {self.max_seconds:g}s used"
+        return None
+
+    def allows(self, role, prompt=""):
+        reason = self.stop_reason or self._exceeded(prompt)
+        if reason is None:
+            return True
+        if self.stop_reason is None:
+            self.stop_reason = reason
+            print(f"⏹️ Budget exhausted: {reason}")
+        self.denied[role] += 1
+        return False
+
+    def charge(self, prompt, response):
+        self.calls += 1
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None)
+        if total is None:
+            total = count_tokens(prompt) + count_tokens(response.text)
+        self.tokens += total
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "tokens": self.tokens,
+            "elapsed_s": round(self.elapsed, 2),
+            "denied": dict(self.denied),
+            "stop_reason": self.stop_reason,
+        }
@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+CHECKPOINT_DIR = os.environ.get("AGENT_CHECKPOINT_DIR", ".agent_checkpoints")
+CHECKPOINTS_ENABLED = os.environ.get("AGENT_CHECKPOINTS", "1") == "1"  # 0 disables checkpointing entirely
+KEEP_FINISHED = os.environ.get("AGENT_KEEP_CHECKPOINTS") == "1"  # keep checkpoints of runs that completed
+RUN_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+@dataclass
+class RunCheckpoint:
+    run_id: str
+    goal: str
+    plan: str = ""
+    steps: list = field(default_factory=list)
+    results: dict = field(default_factory=dict)  # str(step index) -> {"step", "output", "critiques", "failed", ...}
+    # planning -> running -> done, incomplete when a step failed, or stopped when the budget ran out
+    status: str = "planning"
+    stop_reason: str = ""
+    updated_at: str = ""
+
+    def is_completed(self, i):
+        result = self.results.get(str(i))
+        return result is not None and not result["failed"]
+
+    def output(self, i):
+        return self.results[str(i)]["output"]
+
+    def unreviewed_output(self, i):
+        """Answer saved for step i when the budget ran out before the critic saw it, else None."""
+        result = self.results.get(str(i))
+        return result["output"] if result is not None and result.get("unreviewed") else None
+
+    def record_step(self, i, output, critiques=(), failed=False, unreviewed=False):
+        self.results[str(i)] = {
+            "step": self.steps[i],
+            "output": output,
+            "critiques": list(critiques),
+            "failed": failed,
+            "unreviewed": unreviewed,
+        }
+
+    def completed_steps(self):
+        return sum(self.is_completed(i) for i in range(len(self.steps)))
+
+
+class CheckpointStore:
+    """
+    One JSON file per run under `root`, rewritten atomically after the plan
+    and after every step, so a crash or quota error loses at most the step
+    in progress. Orchestrators take `run_id=` to resume: the stored plan is
+    reused and completed steps are skipped instead of re-billed. A run whose
+    steps all passed is deleted unless `keep_finished`; incomplete and
+    stopped runs stay resumable.
+    Run ids become file names, so only letters, digits, `_` and `-` are allowed.
+    """
+
+    def __init__(self, root=CHECKPOINT_DIR, keep_finished=KEEP_FINISHED):
+        self.root = root
+        self.keep_finished = keep_finished
+
+    @classmethod
+    def from_env(cls):
+        """The agents' store: AGENT_CHECKPOINTS=0 disables it (None), AGENT_KEEP_CHECKPOINTS=1 keeps done runs."""
+        return cls() if CHECKPOINTS_ENABLED else None
+
+    def _path(self, run_id):
+        if not isinstance(run_id, str) or not RUN_ID_PATTERN.fullmatch(run_id):
+            raise ValueError(f"Invalid run id {run_id!r}: use up to 64 letters, digits, '_' or '-'")
+        return os.path.join(self.root, f"{run_id}.json")
+
+    def start(self, goal, run_id=None):
+        """Load the checkpoint for `run_id`, or start a new run."""
+        if run_id is not None:
+            checkpoint = self.load(run_id)
+            if checkpoint is not None:
+                if checkpoint.goal != goal:
+                    raise ValueError(f"Run {run_id} was started for a different goal: {checkpoint.goal!r}")
+                return checkpoint
+
+        checkpoint = RunCheckpoint(run_id=run_id or uuid.uuid4().hex[:12], goal=goal)
+        self.save(checkpoint)
+        return checkpoint
+
+    def load(self, run_id):
+        try:
+            with open(self._path(run_id), encoding="utf-8") as f:
+                return RunCheckpoint(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint):
+        os.makedirs(self.root, exist_ok=True)
+        checkpoint.updated_at = str(datetime.now())
+        path = self._path(checkpoint.run_id)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(checkpoint), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def finish(self, checkpoint):
+        """Save the final state of a run, or drop it if it completed and is not kept."""
+        if checkpoint.status == "done" and not self.keep_finished:
+            self.delete(checkpoint.run_id)
+        else:
+            self.save(checkpoint)
+
+    def delete(self, run_id):
+        try:
+            os.remove(self._path(run_id))
+        except FileNotFoundError:
+            pass
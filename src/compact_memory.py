@@ -0,0 +1,236 @@
+import time
+from array import array
+from datetime import datetime
+
+QUANTIZATIONS = ("float32", "fp16", "int8")
+
+
+# ================== METADATA STORE ==================
+class MemoryStore:
+    """
+    Columnar, array-backed replacement for a list of memory dicts.
+
+    Content lives in one UTF-8 blob addressed by an offsets array, topics are
+    interned to small integer ids and timestamps are int64 nanoseconds, so an
+    entry costs its text plus ~20 bytes instead of a dict with three objects.
+    Indexing returns a freshly built dict so existing `memory["content"]`
+    callers keep working.
+    """
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._offsets = array("Q", [0])  # entry i is _blob[_offsets[i]:_offsets[i + 1]]
+        self._topic_ids = array("I")
+        self._timestamps = array("q")
+        self._topics = []  # topic id -> name
+        self._topic_lookup = {}  # name -> topic id
+
+    def _intern(self, topic):
+        topic_id = self._topic_lookup.get(topic)
+        if topic_id is None:
+            topic_id = len(self._topics)
+            self._topics.append(topic)
+            self._topic_lookup[topic] = topic_id
+        return topic_id
+
+    def append(self, content, topic="general", timestamp_ns=None):
+        self._blob += content.encode("utf-8")
+        self._offsets.append(len(self._blob))
+        self._topic_ids.append(self._intern(topic))
+        self._timestamps.append(time.time_ns() if timestamp_ns is None else timestamp_ns)
+        return len(self._timestamps) - 1
+
+    def content(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def topic(self, i):
+        return self._topics[self._topic_ids[i]]
+
+    def timestamp(self, i):
+        return datetime.fromtimestamp(self._timestamps[i] / 1e9)
+
+    def with_topic(self, topic):
+        """Entries of one topic, found by comparing ids rather than decoding every entry."""
+        topic_id = self._topic_lookup.get(topic)
+        return [self[i] for i, t in enumerate(self._topic_ids) if t == topic_id]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("memory index out of range")
+        return {"content": self.content(i), "topic": self.topic(i), "timestamp": str(self.timestamp(i))}
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def nbytes(self):
+        arrays = (self._offsets, self._topic_ids, self._timestamps)
+        return len(self._blob) + sum(a.itemsize * len(a) for a in arrays)
+
+
+# ================== VECTOR INDEX ==================
+INT8_CLAMP = 4.0  # int8 range is +/- INT8_CLAMP / sqrt(dimension) per component
+
+
+def int8_range(dimension, sample=None):
+    """
+    Per-component (min, max) the int8 quantizer is trained on.
+
+    Components of a unit vector in d dimensions have a spread of about
+    1/sqrt(d), so +/- 4/sqrt(d) covers them with room to spare while using
+    far more of the 256 levels than the full [-1, 1] range would. Rare
+    components outside it are clamped. A `sample` of real embeddings widens
+    the range wherever the data actually goes further.
+    """
+    import numpy as np
+
+    bound = INT8_CLAMP / np.sqrt(dimension)
+    lo = np.full(dimension, -bound, dtype="float32")
+    hi = np.full(dimension, bound, dtype="float32")
+    if sample is not None and len(sample):
+        sample = np.asarray(sample, dtype="float32")
+        lo = np.minimum(lo, sample.min(axis=0))
+        hi = np.maximum(hi, sample.max(axis=0))
+    return lo, hi
+
+
+def make_vector_index(dimension, quantization="float32", sample=None):
+    """
+    Inner-product FAISS index storing vectors as float32, fp16 or int8.
+
+    Vectors must be unit-normalized. The int8 quantizer is trained on
+    int8_range(), so it needs no training set and does not go stale;
+    `sample` only widens that range.
+    """
+    import faiss
+    import numpy as np
+
+    if quantization == "float32":
+        return faiss.IndexFlatIP(dimension)
+    if quantization == "fp16":
+        return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    if quantization == "int8":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(np.stack(int8_range(dimension, sample)))
+        return index
+    raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+
+
+VECTOR_BYTES = {"float32": 4, "fp16": 2, "int8": 1}
+
+
+# ================== BENCHMARK ==================
+def _decode(vectors, quantization, lo=None, hi=None):
+    """What an index of `quantization` reconstructs from `vectors` (numpy stand-in for faiss)."""
+    import numpy as np
+
+    if quantization == "float32":
+        return vectors
+    if quantization == "fp16":
+        return vectors.astype("float16").astype("float32")
+    if lo is None:
+        lo, hi = int8_range(vectors.shape[1])
+    scale = (hi - lo) / 255
+    codes = np.clip(np.floor((vectors - lo) / scale), 0, 255)
+    return (lo + (codes + 0.5) * scale).astype("float32")
+
+
+def _search_quality(corpus, queries, quantization, k=3, bounds=None):
+    """(top-k recall vs exact search, max and mean score error) for one index type."""
+    import numpy as np
+
+    exact = queries @ corpus.T
+    true_top = np.argsort(-exact, axis=1)[:, :k]
+
+    if bounds is None:
+        try:
+            index = make_vector_index(corpus.shape[1], quantization)
+            index.add(corpus)
+            scores, ids = index.search(queries, k)
+        except ImportError:
+            bounds = (None, None)
+    if bounds is not None:
+        approx = queries @ _decode(corpus, quantization, *bounds).T
+        ids = np.argsort(-approx, axis=1)[:, :k]
+        scores = np.take_along_axis(approx, ids, axis=1)
+
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(ids, true_top)])
+    error = np.abs(scores - np.take_along_axis(exact, ids, axis=1))
+    return recall, float(error.max()), float(error.mean())
+
+
+def _measure(build):
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return kept, used
+
+
+if __name__ == "__main__":
+    N = 100_000
+    DIMENSION = 384
+    topics = ["agentic_ai", "agent_design", "vector_databases", "learned_answer"]
+    texts = [f"Learned answer number {i}: vector databases make similarity search fast." for i in range(N)]
+
+    def as_dicts():
+        return [
+            {"content": texts[i], "topic": topics[i % 4], "timestamp": str(datetime.now())}
+            for i in range(N)
+        ]
+
+    def as_columns():
+        store = MemoryStore()
+        for i in range(N):
+            store.append(texts[i], topics[i % 4])
+        return store
+
+    _, dict_bytes = _measure(as_dicts)
+    store, column_bytes = _measure(as_columns)
+
+    print(f"Metadata for {N:,} memories (content strings excluded from the dict figure)")
+    print(f"  list of dicts : {dict_bytes / N:8.1f} bytes/entry")
+    print(f"  MemoryStore   : {column_bytes / N:8.1f} bytes/entry (content included)")
+    print(f"  content blob  : {len(store._blob) / N:8.1f} bytes/entry")
+
+    print(f"\nVector payload for {DIMENSION}-d embeddings")
+    for name in QUANTIZATIONS:
+        print(f"  {name:8}: {DIMENSION * VECTOR_BYTES[name]:6d} bytes/entry")
+
+    try:
+        for name in QUANTIZATIONS:
+            print(f"  faiss {name:8} code size: {make_vector_index(DIMENSION, name).sa_code_size()} bytes/entry")
+    except ImportError:
+        print("  (faiss not installed, skipping index code sizes; search quality below is a numpy emulation)")
+
+    # Queries are noisy copies of stored memories, so the best matches score
+    # around the 0.5-0.9 band RELEVANCE_THRESHOLD cuts through
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    corpus = rng.standard_normal((10_000, DIMENSION)).astype("float32")
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = corpus[:500] + rng.standard_normal((500, DIMENSION)).astype("float32") / np.sqrt(DIMENSION)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    full_range = (-np.ones(DIMENSION, dtype="float32"), np.ones(DIMENSION, dtype="float32"))
+    print("\nSearch quality vs exact float32 (10,000 memories, 500 queries, top-3)")
+    print(f"  {'index':16} {'recall@3':>9} {'max err':>9} {'mean err':>9}")
+    for name, quantization, bounds in [
+        ("float32", "float32", None),
+        ("fp16", "fp16", None),
+        ("int8", "int8", None),
+        ("int8 [-1, 1]", "int8", full_range),
+    ]:
+        recall, max_err, mean_err = _search_quality(corpus, queries, quantization, bounds=bounds)
+        print(f"  {name:16} {recall:9.3f} {max_err:9.4f} {mean_err:9.4f}")
@@ -0,0 +1,119 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for text embeddings, keyed by (model name, SHA-256 of the text).
+
+    The memory tier is an LRU of normalized vectors; the disk tier is a
+    SQLite file that survives restarts, so seed memories and recurring goals
+    are encoded once per model, not once per process start. `encode_fn`
+    receives the list of texts that missed both tiers and must return their
+    raw embeddings in the same order. It runs without the cache lock held,
+    so two threads missing the same text may both encode it.
+    """
+
+    def __init__(self, model_name, encode_fn, capacity=10_000, path=None):
+        self.model_name = model_name
+        self.encode_fn = encode_fn
+        self.capacity = capacity
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+
+        if self._db is not None:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype=np.float32)
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+
+        self.misses += 1
+        return None
+
+    def embed_many(self, texts):
+        keys = [self._key(t) for t in texts]
+        with self._lock:
+            found = {}  # key -> vector, or None when both tiers missed
+            for key in keys:
+                if key in found:
+                    # Repeated within the batch: served by the first lookup or encode
+                    self.memory_hits += 1
+                else:
+                    found[key] = self._lookup(key)
+
+        missing = {}  # key -> text, deduplicated within the batch
+        for key, text in zip(keys, texts):
+            if found[key] is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            # Encoding runs outside the lock, so a slow batch (the write-behind
+            # thread) does not hold up lookups for other callers
+            raw = np.asarray(self.encode_fn(list(missing.values())), dtype=np.float32)
+            fresh = {key: vec / np.linalg.norm(vec) for key, vec in zip(missing, raw)}
+
+            with self._lock:
+                for key, vec in fresh.items():
+                    self._remember(key, vec)
+                if self._db is not None:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, vec.tobytes()) for key, vec in fresh.items()],
+                    )
+                    self._db.commit()
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,587 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from budget import RunBudget
+from llm_session import StepSession
+from prompt_builder import build_prompt
+from response_parser import ParsedResponse, Verdict, parse_executor_response, parse_verdict
+from short_term_memory import ShortTermMemory
+
+
+# ================== HELPERS ==================
+def numbered_steps(plan):
+    return [line for line in plan.split("\n") if line.strip().startswith(tuple("123456789"))]
+
+
+def as_final_answer(text):
+    """Parser for executors without an answer protocol: the whole reply is the answer."""
+    return ParsedResponse(kind="final", raw=text, answer=text)
+
+
+def from_model(model):
+    """`generate(prompt, step)` for a plain GenerativeModel."""
+    return lambda prompt, step=None: model.generate_content(prompt)
+
+
+def from_router(router, role):
+    """`generate(prompt, step)` that lets a ModelRouter pick the model for `role`."""
+    return lambda prompt, step=None: router.generate(role, prompt, step)
+
+
+# ================== STATE ==================
+@dataclass
+class StepState:
+    index: int
+    step: str
+    prompt: str = ""  # last prompt sent to the executor
+    observations: list = field(default_factory=list)  # feedback for the next attempt, oldest first
+    critiques: list = field(default_factory=list)
+    attempts: int = 0
+    session: Any = None  # per-step executor conversation, for executors that keep one
+    delta_sent: bool = False  # the last executor prompt carried only the latest feedback
+    context: dict = field(default_factory=dict)  # scratch space for stage callbacks
+    failure: Optional[str] = None  # "retries", "invalid" or "budget" when the step did not pass
+
+
+@dataclass
+class RunState:
+    goal: str
+    budget: RunBudget
+    checkpoint: Any = None
+    plan: str = ""
+    steps: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    memory: Any = None  # whatever the memory stage keeps for this run
+    context: dict = field(default_factory=dict)  # scratch space for stage callbacks
+    passed: int = 0
+    failed: int = 0
+    verdict: Optional[Verdict] = None  # set by a run-scoped critic
+
+    @property
+    def text(self):
+        return "\n\n".join(self.outputs)
+
+    @property
+    def stopped(self):
+        return self.budget.stopped
+
+
+# ================== STAGES ==================
+# LLM stages split each call into prompt() and send() so the engine can
+# consult the budget in between. `generate(prompt, step)` returns an SDK
+# response; see from_model() and from_router().
+class Planner:
+    role = "planner"
+
+    def __init__(self, generate, prompt=None):
+        self.generate = generate
+        self.prompt = prompt or (lambda run: run.goal)
+
+    def send(self, prompt, run):
+        return self.generate(prompt, run.goal)
+
+
+class SingleStepPlanner:
+    """No planning call: the goal is the only step (single-agent tool loops)."""
+
+    role = None
+
+    def steps(self, run):
+        return [run.goal]
+
+
+class Executor:
+    """Sends the step on the first attempt and only the latest feedback after that."""
+
+    role = "executor"
+
+    def __init__(self, generate, parse=as_final_answer):
+        self.generate = generate
+        self.parse = parse
+
+    def prompt(self, run, state):
+        return state.observations[-1] if state.observations else state.step
+
+    def send(self, prompt, run, state):
+        return self.generate(prompt, state.step)
+
+
+class SessionExecutor:
+    """
+    Builds sectioned prompts within `token_budget` and keeps one StepSession
+    per step. `model_for(run, state)` picks the model for each attempt; it is
+    only asked in `send`, once the budget has allowed the call, and a new
+    session starts when the model changes (escalation). `sections(run, state)`
+    returns the (TITLE, content) pairs that precede OBSERVATIONS.
+    """
+
+    role = "executor"
+
+    def __init__(self, model_for, sections, use_chat=False, token_budget=1500, footer=None,
+                 parse=parse_executor_response, record_latency=None):
+        self.model_for = model_for
+        self.sections = sections
+        self.use_chat = use_chat
+        self.token_budget = token_budget
+        self.footer = footer
+        self.parse = parse
+        self.record_latency = record_latency
+
+    def _full_prompt(self, run, state):
+        return build_prompt(
+            self.sections(run, state),
+            observations=state.observations,
+            footer=self.footer,
+            budget_tokens=self.token_budget,
+        )
+
+    def prompt(self, run, state):
+        state.delta_sent = state.session is not None and state.session.wants_delta
+        if state.delta_sent:
+            # Earlier turns are already in the chat; only the latest feedback is new
+            return build_prompt([], observations=state.observations[-1:], footer=self.footer)
+        return self._full_prompt(run, state)
+
+    def send(self, prompt, run, state):
+        model = self.model_for(run, state)
+        if state.session is None or state.session.model is not model:
+            if state.delta_sent:
+                # A new model's chat has none of the earlier turns
+                prompt, state.delta_sent = self._full_prompt(run, state), False
+            state.session = StepSession(model, use_chat=self.use_chat)
+
+        started = time.perf_counter()
+        response = state.session.send(prompt)
+        if self.record_latency is not None:
+            self.record_latency(time.perf_counter() - started)
+        return response
+
+
+class Critic:
+    """
+    Reviews each step's answer (`scope="step"`) or, once, the joined output
+    of the whole run (`scope="run"`, state is None then).
+    """
+
+    role = "critic"
+
+    def __init__(self, generate, prompt=None, parse=parse_verdict, scope="step"):
+        self.generate = generate
+        self.prompt = prompt or (lambda run, state, answer: answer)
+        self.parse = parse
+        self.scope = scope
+
+    def send(self, prompt, run, state):
+        return self.generate(prompt, state.step if state is not None else run.goal)
+
+
+class ShortTermRecall:
+    """Per-run ShortTermMemory of passed steps, available to prompts as `run.memory`."""
+
+    def __init__(self, max_items=5, max_tokens=600):
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+
+    def start(self, run):
+        run.memory = ShortTermMemory(max_items=self.max_items, max_tokens=self.max_tokens)
+
+    def remember(self, run, step, answer):
+        run.memory.add(step, answer)
+
+    # Steps skipped on resume still belong in the window
+    restore = remember
+
+    def block(self, run, state):
+        """PREVIOUS STEPS text for a step; rendered once, memory only changes when a step passes."""
+        if "previous_steps" not in state.context:
+            state.context["previous_steps"] = run.memory.render()
+        return state.context["previous_steps"]
+
+    def sent(self, run, state):
+        # Full prompts carry the block on every retry; chat deltas go out without it
+        if not state.delta_sent and state.context.get("previous_steps"):
+            run.memory.record_sent(state.context["previous_steps"])
+
+
+class LongTermRecall:
+    """
+    Retrieves memories for the goal before planning (joined into `run.memory`)
+    and hands every answer the critic passes to `learn`.
+    """
+
+    def __init__(self, retrieve, learn):
+        self.retrieve = retrieve
+        self.learn = learn
+
+    def start(self, run):
+        run.memory = "\n".join(self.retrieve(run.goal))
+
+    def remember(self, run, step, answer):
+        self.learn(answer)
+
+    def restore(self, run, step, output):
+        pass  # learned when the step first passed
+
+    def sent(self, run, state):
+        pass
+
+
+# ================== POLICY ==================
+def critique_as_feedback(state, answer, critique):
+    return critique
+
+
+def tool_result_feedback(state, tool, observation):
+    return f"Tool result: {observation}"
+
+
+def unknown_tool_feedback(state, tool, available):
+    return f"ERROR: Tool '{tool}' not available.\nAvailable tools: {available}"
+
+
+def tool_error_feedback(state, error):
+    return f"""
+Original task:
+{state.step}
+
+An error occurred while handling a tool request:
+{error}
+
+If a tool is not required, answer directly.
+If a tool is required, issue a correct tool request.
+"""
+
+
+def invalid_feedback(state, parsed):
+    return "Executor did not provide FINAL ANSWER. Retry with clarity."
+
+
+@dataclass
+class EnginePolicy:
+    max_retries: int = 3  # executor calls per step, tool calls and format retries included
+    retry_invalid: bool = True  # False fails the step on the first unparseable reply
+    failed_output: Optional[Callable] = None  # state -> text kept for a failed step; None keeps nothing
+    critique_feedback: Callable = critique_as_feedback
+    tool_feedback: Callable = tool_result_feedback
+    unknown_tool_feedback: Callable = unknown_tool_feedback
+    tool_error_feedback: Callable = tool_error_feedback
+    invalid_feedback: Callable = invalid_feedback
+    verbose: bool = True
+
+
+# ================== ENGINE ==================
+class Engine:
+    """
+    The plan -> execute -> tools -> critique loop behind agent_2 ... agent_8.
+
+    Stages are plain objects (see above); everything optional defaults to
+    None and is skipped. With a `router`, steps start and escalate through
+    it; with `checkpoints`, runs are saved per step and `run(goal, run_id)`
+    resumes. Every LLM call is cleared with the run's RunBudget first, and
+    when it runs out the run stops with what it has.
+    """
+
+    def __init__(self, planner, executor, critic=None, tools=None, memory=None, policy=None,
+                 router=None, checkpoints=None):
+        self.planner = planner
+        self.executor = executor
+        self.critic = critic
+        self.tools = tools
+        self.memory = memory
+        self.policy = policy or EnginePolicy()
+        self.router = router
+        self.checkpoints = checkpoints
+
+    def _log(self, *args):
+        if self.policy.verbose:
+            print(*args)
+
+    def _call(self, run, stage, prompt, *args):
+        if not run.budget.allows(stage.role, prompt):
+            return None
+        response = stage.send(prompt, run, *args)
+        run.budget.charge(prompt, response)
+        return response
+
+    def _save(self, run):
+        if run.checkpoint is not None:
+            self.checkpoints.save(run.checkpoint)
+
+    def _record(self, run, state, output, failed=False, unreviewed=False):
+        if run.checkpoint is not None:
+            run.checkpoint.record_step(state.index, output, state.critiques, failed=failed, unreviewed=unreviewed)
+
+    # ---- run ----
+    def run(self, goal, run_id=None, budget=None):
+        run = RunState(goal=goal, budget=budget or RunBudget.from_env())
+        self._log("\n🎯 GOAL:\n", goal)
+
+        if self.memory is not None:
+            self.memory.start(run)
+
+        if self.checkpoints is not None:
+            run.checkpoint = self.checkpoints.start(goal, run_id)
+            self._log(f"\n💾 Run id: {run.checkpoint.run_id}")
+
+        if run.checkpoint is not None and run.checkpoint.steps:
+            run.plan, run.steps = run.checkpoint.plan, run.checkpoint.steps
+            self._log(f"\n⏩ Resuming: {run.checkpoint.completed_steps()}/{len(run.steps)} steps already done")
+        else:
+            self._plan(run)
+            if run.checkpoint is not None:
+                run.checkpoint.plan, run.checkpoint.steps, run.checkpoint.status = run.plan, run.steps, "running"
+                self._save(run)
+
+        for i, step in enumerate(run.steps):
+            if run.checkpoint is not None and run.checkpoint.is_completed(i):
+                output = run.checkpoint.output(i)
+                run.outputs.append(output)
+                if self.memory is not None:
+                    self.memory.restore(run, step, output)
+                continue
+            if run.stopped:
+                break
+
+            self._run_step(run, StepState(index=i, step=step))
+            self._save(run)
+
+        if self.critic is not None and self.critic.scope == "run" and not run.stopped:
+            self._review_run(run)
+
+        if run.stopped:
+            run.outputs.append(f"⏹️ Stopped early: {run.budget.stop_reason}")
+        if run.checkpoint is not None:
+            if run.stopped:
+                run.checkpoint.status, run.checkpoint.stop_reason = "stopped", run.budget.stop_reason
+            else:
+                # Failed steps keep the checkpoint: a rerun with the run_id retries only them
+                run.checkpoint.status = "done" if run.failed == 0 else "incomplete"
+                run.checkpoint.stop_reason = ""
+            self.checkpoints.finish(run.checkpoint)
+        return run
+
+    def resume(self, run_id, budget=None):
+        """Continue the checkpointed run `run_id` with its stored goal and plan."""
+        if self.checkpoints is None:
+            raise ValueError("Checkpoints are disabled (AGENT_CHECKPOINTS=0), nothing to resume")
+        checkpoint = self.checkpoints.load(run_id)
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint found for run {run_id}")
+        return self.run(checkpoint.goal, run_id, budget)
+
+    def _plan(self, run):
+        planner = self.planner
+        if planner.role is None:
+            run.steps = planner.steps(run)
+            return
+
+        if self.router is not None:
+            self.router.start_step(run.goal, role="planner")
+        prompt = planner.prompt(run)
+        response = self._call(run, planner, prompt)
+        run.plan = response.text if response is not None else ""
+        run.steps = numbered_steps(run.plan)
+
+        if (not run.steps and not run.stopped and self.router is not None
+                and self.router.escalate(run.goal, "planner returned no numbered steps", role="planner")):
+            response = self._call(run, planner, prompt)
+            if response is not None:
+                run.plan = response.text
+                run.steps = numbered_steps(run.plan)
+
+        self._log("\n🧠 PLAN:\n", run.plan)
+
+    # ---- steps ----
+    def _run_step(self, run, state):
+        policy = self.policy
+        self._log(f"\n➡️ STEP: {state.step}")
+        if self.router is not None:
+            self.router.start_step(state.step)
+
+        answer = run.checkpoint.unreviewed_output(state.index) if run.checkpoint is not None else None
+        if answer is not None:
+            # Resumed after the budget ran out mid-review: review the saved answer before re-executing
+            self._log("\n🔁 Reviewing the answer saved by the interrupted run")
+            if self._review(run, state, answer):
+                return
+
+        while state.attempts < policy.max_retries:
+            state.prompt = self.executor.prompt(run, state)
+            response = self._call(run, self.executor, state.prompt, state)
+            if response is None:
+                # Out of budget before the step finished: nothing to keep or record
+                state.failure = "budget"
+                return
+            state.attempts += 1
+            if self.memory is not None:
+                self.memory.sent(run, state)
+            self._log(f"\nExecutor attempt {state.attempts}:\n{response.text}")
+
+            parsed = self.executor.parse(response.text)
+            if parsed.is_final:
+                if self._review(run, state, parsed.answer):
+                    return
+            elif parsed.is_tool and self.tools is not None:
+                self._use_tool(state, parsed)
+            elif policy.retry_invalid:
+                state.observations.append(policy.invalid_feedback(state, parsed))
+            else:
+                state.failure = "invalid"
+                break
+        else:
+            state.failure = "retries"
+
+        run.failed += 1
+        output = policy.failed_output(state) if policy.failed_output else None
+        if output is not None:
+            run.outputs.append(output)
+        # Failed steps are not skipped on resume; they get a fresh set of retries
+        self._record(run, state, None, failed=True)
+
+    def _review(self, run, state, answer):
+        """True when the step is finished with `answer`, False to retry it."""
+        critic = self.critic
+        if critic is not None and critic.scope == "step":
+            prompt = critic.prompt(run, state, answer)
+            response = self._call(run, critic, prompt, state)
+            if response is None:
+                # Out of budget: keep the answer unreviewed rather than lose it.
+                # A resumed run sends it to the critic before executing the step again.
+                run.outputs.append(f"⚠️ Unreviewed: {answer}")
+                self._record(run, state, answer, failed=True, unreviewed=True)
+                return True
+
+            critique = response.text.strip()
+            self._log("\n🧐 CRITIC:", critique)
+            verdict = critic.parse(critique)
+            if not verdict.passed:
+                state.critiques.append(critique)
+                if self.router is not None and self.router.escalate(
+                        state.step, "critique" if verdict.confident else "unclear critic verdict"):
+                    state.session = None  # the escalated model starts a fresh conversation
+                state.observations.append(self.policy.critique_feedback(state, answer, critique))
+                return False
+
+        run.outputs.append(answer)
+        run.passed += 1
+        self._record(run, state, answer)
+        if self.memory is not None:
+            self.memory.remember(run, state.step, answer)
+        return True
+
+    def _use_tool(self, state, parsed):
+        policy = self.policy
+        tool = parsed.action
+        if tool not in self.tools:
+            state.observations.append(policy.unknown_tool_feedback(state, tool, list(self.tools.keys())))
+            return
+
+        self._log(f"🔧 Using tool: {tool}")
+        try:
+            observation = self.tools.call(tool, parsed.input)
+        except Exception as e:
+            state.observations.append(policy.tool_error_feedback(state, e))
+            return
+        self._log(f"📌 Observation: {observation}")
+        state.observations.append(policy.tool_feedback(state, tool, observation))
+
+    def _review_run(self, run):
+        prompt = self.critic.prompt(run, None, run.text)
+        response = self._call(run, self.critic, prompt, None)
+        if response is not None:
+            self._log("\n🧐 CRITIQUE:\n", response.text)
+            run.verdict = self.critic.parse(response.text)
+
+
+# ================== BENCHMARK ==================
+if __name__ == "__main__":
+    # Engine overhead next to the hand-written loop it replaces, on llm_stub
+    # models with a fixed per-call latency. "bare" is the minimal engine;
+    # "routed" is how agents 7 and 8 run it (ModelRouter, SessionExecutor,
+    # short-term memory) and "+checkpoints" adds a CheckpointStore on disk.
+    # Configurations are timed in turn within each repeat and the median is
+    # reported, so drift on the machine does not land on one of them.
+    import functools
+    import statistics
+    import tempfile
+    import types
+
+    import llm_stub
+    from checkpoint import CheckpointStore
+    from model_router import ModelRouter
+
+    # latency per call (s) -> (goals per timing, repeats); real calls are 200ms+
+    POINTS = {0.0: (20, 31), 0.001: (20, 15), 0.01: (10, 9), 0.2: (2, 5)}
+    PROMPTS = {"planner": "You are a planning agent.", "executor": "You are an execution agent.",
+               "critic": "You are a critic agent."}
+
+    def routed_engine(latency, checkpoints=None):
+        genai = types.SimpleNamespace(GenerativeModel=functools.partial(llm_stub.GenerativeModel, latency=latency))
+        router = ModelRouter(genai, PROMPTS)
+        return Engine(
+            Planner(from_router(router, "planner")),
+            SessionExecutor(
+                lambda run, state: router.model_for("executor", state.step),
+                lambda run, state: [("GOAL", run.goal), ("STEP", state.step)],
+                record_latency=router.record_latency,
+            ),
+            Critic(from_router(router, "critic")),
+            memory=ShortTermRecall(),
+            policy=EnginePolicy(verbose=False),
+            router=router,
+            checkpoints=checkpoints,
+        )
+
+    def measure(latency, goals, repeats, checkpoint_dir):
+        planner_model, executor_model, critic_model = models = [
+            llm_stub.GenerativeModel(system_instruction=PROMPTS[role], latency=latency)
+            for role in ("planner", "executor", "critic")
+        ]
+
+        def direct(goal):
+            outputs = []
+            for step in numbered_steps(planner_model.generate_content(goal).text):
+                answer = parse_executor_response(executor_model.generate_content(step).text).answer
+                if parse_verdict(critic_model.generate_content(answer).text).passed:
+                    outputs.append(answer)
+            return "\n\n".join(outputs)
+
+        engines = {
+            "bare": Engine(
+                Planner(from_model(planner_model)),
+                Executor(from_model(executor_model), parse=parse_executor_response),
+                Critic(from_model(critic_model)),
+                policy=EnginePolicy(verbose=False),
+            ),
+            "routed": routed_engine(latency),
+            "+checkpoints": routed_engine(latency, CheckpointStore(checkpoint_dir)),
+        }
+        configs = {"direct": direct}
+        configs.update({name: functools.partial(lambda engine, goal: engine.run(goal, budget=RunBudget()), engine)
+                        for name, engine in engines.items()})
+
+        calls_before = sum(m.calls for m in models)
+        direct("Goal")
+        calls = (sum(m.calls for m in models) - calls_before) * goals
+
+        times = {name: [] for name in configs}
+        for _ in range(repeats):
+            for name, fn in configs.items():
+                started = time.perf_counter()
+                for i in range(goals):
+                    fn(f"Goal {i}")
+                times[name].append(time.perf_counter() - started)
+        return calls, {name: statistics.median(samples) for name, samples in times.items()}
+
+    print(f"{'latency/call':>12} {'engine':>13} {'calls':>6} {'direct s':>9} {'engine s':>9} "
+          f"{'overhead/call':>14} {'overhead %':>10}")
+    with tempfile.TemporaryDirectory() as checkpoint_dir:
+        for latency, (goals, repeats) in POINTS.items():
+            calls, medians = measure(latency, goals, repeats, checkpoint_dir)
+            direct_s = medians.pop("direct")
+            for name, seconds in medians.items():
+                per_call_us = (seconds - direct_s) / calls * 1e6
+                share = (seconds - direct_s) / direct_s * 100
+                print(f"{latency * 1000:>10.0f}ms {name:>13} {calls:>6} {direct_s:>9.4f} {seconds:>9.4f} "
+                      f"{per_call_us:>12.1f}us {share:>9.2f}%")
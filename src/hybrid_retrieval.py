@@ -0,0 +1,88 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+# Keeps identifiers like "E-1042", "gpt-4o" or "faiss.IndexFlatIP" as single terms
+TERM_RE = re.compile(r"[a-z0-9]+(?:[._\-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it of on or that the this to was what when "
+    "which who why with you your".split()
+)
+RRF_K = 60  # standard reciprocal-rank-fusion damping constant
+
+
+def tokenize(text):
+    return [t for t in TERM_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring.
+
+    Documents are added one at a time (`add` is O(terms in the document)),
+    and IDF/length statistics are read at query time, so no rebuild is
+    needed after inserts.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    def add(self, doc_id, text):
+        if doc_id in self.doc_lengths:
+            raise ValueError(f"Document {doc_id} is already indexed")
+
+        terms = tokenize(text)
+        for term, tf in Counter(terms).items():
+            self.postings[term][doc_id] = tf
+        self.doc_lengths[doc_id] = len(terms)
+        self.total_length += len(terms)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k):
+        """Top-k (doc_id, score) pairs for documents sharing at least one term with `query`."""
+        if not self.doc_lengths:
+            return []
+
+        avg_length = self.total_length / len(self.doc_lengths) or 1.0
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def strong_matches(self, query, k, min_score, relative_cutoff):
+        """
+        Doc ids from `search` that score at least `min_score` and at least
+        `relative_cutoff` times the best match, so a match on a common word
+        alone does not count.
+        """
+        hits = self.search(query, k)
+        cutoff = max(min_score, relative_cutoff * hits[0][1]) if hits else 0
+        return [doc_id for doc_id, score in hits if score >= cutoff]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse several ranked lists of doc ids into one; ids ranked high anywhere float up."""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (k + rank)
+    return [doc_id for doc_id, _ in sorted(fused.items(), key=lambda item: (-item[1], item[0]))]
@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+
+from prompt_builder import count_tokens
+
+
+# ================== STATS ==================
+@dataclass
+class SessionStats:
+    calls: int = 0
+    prompt_tokens: int = 0  # input tokens reported by the API, replayed chat history included
+    cached_tokens: int = 0  # part of prompt_tokens the API reports as served from its cache
+    delta_sends: int = 0  # chat turns that added only the new feedback (the history is still billed)
+
+    def record(self, response, sent_text):
+        self.calls += 1
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and getattr(usage, "prompt_token_count", None) is not None:
+            self.prompt_tokens += usage.prompt_token_count
+            self.cached_tokens += getattr(usage, "cached_content_token_count", 0) or 0
+        else:
+            self.prompt_tokens += count_tokens(sent_text)
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "uncached_tokens": self.prompt_tokens - self.cached_tokens,
+            "delta_sends": self.delta_sends,
+        }
+
+
+SESSION_STATS = SessionStats()
+
+
+# ================== STEP SESSION ==================
+class StepSession:
+    """
+    One executor conversation per plan step.
+
+    With `use_chat`, the first attempt sends the full prompt and, once
+    `wants_delta` is True, retries add only the new feedback to the chat.
+    The SDK replays the whole history to the API on every turn, so a retry
+    is billed for every earlier prompt and answer, which is usually more
+    input than the compact full prompt a stateless retry sends. Chat mode
+    keeps the model's earlier attempts in view; it does not save tokens.
+    """
+
+    def __init__(self, model, use_chat=True, stats=SESSION_STATS):
+        self.model = model
+        self.chat = model.start_chat(history=[]) if use_chat else None
+        self.stats = stats
+        self.turns = 0
+
+    @property
+    def wants_delta(self):
+        return self.chat is not None and self.turns > 0
+
+    def send(self, prompt):
+        if self.chat is None:
+            response = self.model.generate_content(prompt)
+        else:
+            if self.wants_delta:
+                self.stats.delta_sends += 1
+            response = self.chat.send_message(prompt)
+
+        self.turns += 1
+        self.stats.record(response, prompt)
+        return response
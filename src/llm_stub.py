@@ -0,0 +1,93 @@
+# Offline stand-in for the parts of `google.generativeai` the agents use.
+#
+# Pass it wherever a genai module is expected (e.g. ModelRouter(llm_stub, ...)) to exercise
+# chat sessions and the orchestrators without an API key.
+# Token counts come from the local estimator in prompt_builder.
+import time
+from dataclasses import dataclass
+
+from prompt_builder import count_tokens
+
+def configure(**kwargs):
+    pass
+
+
+def default_responder(prompt, system_instruction):
+    role = system_instruction.lower()
+    if "critic" in role:
+        return "PASS"
+    if "planning" in role:
+        return "1. First step\n2. Second step\n3. Third step"
+    return "FINAL ANSWER: stub answer"
+
+
+@dataclass
+class UsageMetadata:
+    prompt_token_count: int
+    cached_content_token_count: int
+    candidates_token_count: int
+
+    @property
+    def total_token_count(self):
+        return self.prompt_token_count + self.candidates_token_count
+
+
+@dataclass
+class StubResponse:
+    text: str
+    usage_metadata: UsageMetadata
+
+
+def _as_text(contents):
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(_as_text(c) for c in contents)
+
+
+# ================== MODEL ==================
+class ChatSession:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, **kwargs):
+        text = _as_text(content)
+        # Like the real SDK, the whole history goes out with every turn
+        response = self.model._respond(self.history + [text])
+        self.history += [text, response.text]
+        return response
+
+
+class GenerativeModel:
+    def __init__(self, model_name="gemini-2.5-flash", system_instruction=None, generation_config=None,
+                 responder=None, latency=0.0, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction or ""
+        self.generation_config = generation_config
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.calls = 0
+
+    def _respond(self, turns):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt_tokens = count_tokens(self.system_instruction) + sum(count_tokens(t) for t in turns)
+        text = self.responder(turns[-1], self.system_instruction)
+
+        return StubResponse(
+            text=text,
+            usage_metadata=UsageMetadata(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=0,
+                candidates_token_count=count_tokens(text),
+            ),
+        )
+
+    def generate_content(self, contents, **kwargs):
+        text = _as_text(contents)
+        return self._respond([text])
+
+    def start_chat(self, history=None, **kwargs):
+        return ChatSession(self, history)
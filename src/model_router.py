@@ -0,0 +1,106 @@
+import statistics
+import time
+from collections import Counter
+
+from prompt_builder import count_tokens
+
+MODEL = "gemini-2.5-flash"
+LIGHT_MODEL = "gemini-2.5-flash-lite"
+SIMPLE_STEP_TOKENS = 30  # plan steps at most this long count as simple
+
+# Role -> model used until a step escalates. Critic verdicts and plans are
+# short, constrained outputs, so they start on the lighter model, and so do
+# executor calls for simple steps.
+DEFAULT_POLICY = {
+    "planner": LIGHT_MODEL,
+    "critic": LIGHT_MODEL,
+    "executor": MODEL,
+    "executor_simple": LIGHT_MODEL,
+}
+
+
+class ModelRouter:
+    """
+    Picks the Gemini model for each role and escalates on failure.
+
+    A step starts on the policy model for its role. After a critique or a
+    low-confidence critic verdict, `escalate(step)` moves that step to
+    `escalation_model` for every role until the step starts again. Models are
+    built lazily and shared per (model name, role). The planner starts and
+    escalates the goal with `role="planner"`, which keeps it out of the
+    per-step escalation rate.
+    """
+
+    def __init__(self, genai_module, system_instructions, policy=None, escalation_model=MODEL,
+                 generation_configs=None):
+        self.genai = genai_module
+        self.system_instructions = system_instructions  # role -> system instruction
+        self.generation_configs = generation_configs or {}  # role -> generation_config
+        self.policy = dict(DEFAULT_POLICY, **(policy or {}))
+        self.escalation_model = escalation_model
+        self._models = {}
+        self._escalated = set()
+
+        self.calls = Counter()  # (model name, role) -> calls
+        self.latencies = []
+        self.escalations = 0
+        self.step_escalations = 0  # escalations of executor steps, the numerator of escalation_rate
+        self.steps = 0
+
+    # ---- routing ----
+    def model_name(self, role, step=None):
+        if step is not None and step in self._escalated:
+            return self.escalation_model
+        if role == "executor" and step is not None and count_tokens(step) <= SIMPLE_STEP_TOKENS:
+            return self.policy.get("executor_simple", self.policy["executor"])
+        return self.policy.get(role, self.escalation_model)
+
+    def model_for(self, role, step=None):
+        """Model for the next `role` call on `step`. Call once per request; it is counted."""
+        name = self.model_name(role, step)
+        key = (name, role)
+        if key not in self._models:
+            self._models[key] = self.genai.GenerativeModel(
+                model_name=name,
+                system_instruction=self.system_instructions[role],
+                generation_config=self.generation_configs.get(role),
+            )
+        self.calls[key] += 1
+        return self._models[key]
+
+    def generate(self, role, prompt, step=None):
+        model = self.model_for(role, step)
+        started = time.perf_counter()
+        response = model.generate_content(prompt)
+        self.record_latency(time.perf_counter() - started)
+        return response
+
+    def record_latency(self, seconds):
+        self.latencies.append(seconds)
+
+    # ---- escalation ----
+    def start_step(self, step, role="executor"):
+        if role == "executor":
+            self.steps += 1
+        self._escalated.discard(step)
+
+    def escalate(self, step, reason="", role="executor"):
+        if step in self._escalated:
+            return False
+        self._escalated.add(step)
+        self.escalations += 1
+        if role == "executor":
+            self.step_escalations += 1
+        print(f"⬆️ Escalating to {self.escalation_model}" + (f" ({reason})" if reason else ""))
+        return True
+
+    def stats(self):
+        total = sum(self.calls.values())
+        expensive = sum(n for (name, _), n in self.calls.items() if name == self.escalation_model)
+        return {
+            "calls": {f"{role}:{name}": n for (name, role), n in sorted(self.calls.items())},
+            "expensive_call_fraction": round(expensive / total, 3) if total else 0.0,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.step_escalations / self.steps, 3) if self.steps else 0.0,
+            "median_latency_ms": round(statistics.median(self.latencies) * 1000, 1) if self.latencies else None,
+        }
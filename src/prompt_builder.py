@@ -0,0 +1,140 @@
+import math
+import re
+import textwrap
+from dataclasses import dataclass
+
+# Rough sub-word split: words, numbers and single punctuation marks
+TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+CHARS_PER_TOKEN = 4  # long words are split into ~4-character pieces by Gemini-style tokenizers
+
+DEFAULT_BUDGET_TOKENS = 1500
+RECENT_OBSERVATIONS = 2  # newest observations are always kept verbatim if they fit
+SUMMARY_CHARS = 160  # older observations are cut down to roughly this much text
+MIN_LATEST_TOKENS = 40  # the newest observation keeps at least this much, even past the budget
+
+
+# ================== TOKEN COUNTING ==================
+def count_tokens(text):
+    """Local token estimate, so prompts can be budgeted without a count_tokens API call."""
+    if not text:
+        return 0
+    return sum(max(1, math.ceil(len(piece) / CHARS_PER_TOKEN)) for piece in TOKEN_RE.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens, marker=" …"):
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    # Binary search on characters; count_tokens is monotonic enough for this
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) + count_tokens(marker) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + marker if lo else ""
+
+
+@dataclass
+class PromptStats:
+    calls: int = 0
+    total_tokens: int = 0
+    max_tokens: int = 0
+    observations_compacted: int = 0  # each observation once, when it leaves the verbatim window
+    observations_dropped: int = 0  # per prompt built, so one left out of three retries counts three times
+
+    def record(self, tokens):
+        self.calls += 1
+        self.total_tokens += tokens
+        self.max_tokens = max(self.max_tokens, tokens)
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "avg_tokens": round(self.total_tokens / self.calls, 1) if self.calls else 0,
+            "max_tokens": self.max_tokens,
+            "observations_compacted": self.observations_compacted,
+            "observations_dropped": self.observations_dropped,
+        }
+
+
+PROMPT_STATS = PromptStats()
+
+
+# ================== NORMALIZATION ==================
+def normalize(text):
+    """Dedent, strip trailing spaces and collapse runs of blank lines."""
+    text = textwrap.dedent(text).strip()
+    text = "\n".join(line.rstrip() for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", text)
+
+
+def _first_sentence(text, max_chars=SUMMARY_CHARS):
+    text = " ".join(text.split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    summary = match.group(1) if match else text
+    return summary if len(summary) <= max_chars else summary[:max_chars].rstrip() + " …"
+
+
+def render_observations(observations, budget_tokens, summarize=None, stats=PROMPT_STATS):
+    """
+    Render observations as a bullet list that fits in `budget_tokens`.
+
+    Newest observations are kept verbatim; older ones are shortened with
+    `summarize` (first sentence by default) and the oldest are dropped once
+    the budget is spent. The newest is never dropped: when the budget is
+    already gone it is cut to MIN_LATEST_TOKENS, which may exceed the budget.
+    """
+    summarize = summarize or _first_sentence
+    lines = []
+    used = 0
+
+    for age, observation in enumerate(reversed(observations)):
+        text = " ".join(str(observation).split())
+        if age >= RECENT_OBSERVATIONS:
+            text = summarize(text)
+
+        line = f"- {text}"
+        cost = count_tokens(line)
+        if used + cost > budget_tokens:
+            if age == 0:
+                # Never drop the latest feedback entirely, shorten it instead
+                lines.append(truncate_to_tokens(line, max(budget_tokens, MIN_LATEST_TOKENS)))
+                dropped = len(observations) - 1
+            else:
+                dropped = len(observations) - age
+            stats.observations_dropped += dropped
+            break
+
+        lines.append(line)
+        used += cost
+        # Lists only grow, so each observation passes this age once across rebuilds
+        if age == RECENT_OBSERVATIONS:
+            stats.observations_compacted += 1
+
+    return "\n".join(reversed(lines)) if lines else "None"
+
+
+# ================== PROMPT BUILDER ==================
+def build_prompt(sections, observations=None, footer=None, budget_tokens=DEFAULT_BUDGET_TOKENS,
+                 summarize=None, stats=PROMPT_STATS):
+    """
+    Build a compact prompt from (TITLE, content) pairs.
+
+    Fixed sections are always included; OBSERVATIONS get whatever is left of
+    `budget_tokens` after them, and at least a shortened latest observation.
+    """
+    parts = [f"{title}:\n{normalize(str(content))}" for title, content in sections]
+    if footer:
+        parts.append(normalize(footer))
+
+    if observations is not None:
+        fixed_tokens = count_tokens("\n\n".join(parts))
+        obs_budget = max(0, budget_tokens - fixed_tokens)
+        block = render_observations(observations, obs_budget, summarize, stats)
+        parts.insert(len(sections), f"OBSERVATIONS:\n{block}")
+
+    prompt = "\n\n".join(parts)
+    stats.record(count_tokens(prompt))
+    return prompt
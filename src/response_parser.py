@@ -0,0 +1,228 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+# Matches "FINAL ANSWER:", "**Final Answer**:", "## final answer -", ... at the start of a line.
+# The marker must be followed by ':'/'-' or end its line, so prose like "Final answer is unclear" is not one.
+FINAL_ANSWER_RE = re.compile(
+    r"^[\s#>*_`-]*final\s+answer[*_`]*(?:[ \t]*[*_`]*[ \t]*[:\-]|[ \t*_`]*$)[\s*_`]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+VERDICT_RE = re.compile(r"^[\s#>*_`-]*(pass|critique)\b[\s*_`]*[:.!\-]?", re.IGNORECASE)
+FENCE_RE = re.compile(r"^\s*```[a-zA-Z0-9_-]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+
+# Schema for Gemini's JSON response mode: every executor reply is one JSON object
+EXECUTOR_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string"},
+        "input": {"type": "string"},
+        "final_answer": {"type": "string"},
+    },
+}
+
+JSON_MODE_INSTRUCTION = """
+Respond ONLY with a JSON object (this replaces any response format given above):
+- To use a tool: {"action": "<tool_name>", "input": "<input>"}
+- To finish: {"final_answer": "<answer>"}
+"""
+
+
+def json_mode_config(schema=None):
+    """generation_config that makes Gemini return JSON matching `schema`."""
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": schema or EXECUTOR_RESPONSE_SCHEMA,
+    }
+
+
+# ================== STATS ==================
+@dataclass
+class ParseStats:
+    parsed: int = 0
+    fences_stripped: int = 0
+    json_repaired: int = 0
+    format_failures: int = 0  # replies that were neither a final answer nor a usable tool request
+
+    def as_dict(self):
+        return {
+            "parsed": self.parsed,
+            "fences_stripped": self.fences_stripped,
+            "json_repaired": self.json_repaired,
+            "format_failures": self.format_failures,
+        }
+
+
+PARSE_STATS = ParseStats()
+
+
+# ================== RESULTS ==================
+@dataclass
+class ParsedResponse:
+    kind: str  # "final", "tool" or "invalid"
+    raw: str
+    answer: Optional[str] = None
+    action: Optional[str] = None
+    input: Any = None
+    error: Optional[str] = None
+
+    @property
+    def is_final(self):
+        return self.kind == "final"
+
+    @property
+    def is_tool(self):
+        return self.kind == "tool"
+
+    @property
+    def is_invalid(self):
+        return self.kind == "invalid"
+
+
+@dataclass
+class Verdict:
+    passed: bool
+    critique: str
+    confident: bool = True  # False when the critic used neither PASS nor CRITIQUE
+    raw: str = field(default="", repr=False)
+
+
+# ================== HELPERS ==================
+def strip_fences(text, stats=None):
+    match = FENCE_RE.match(text)
+    if not match:
+        return text.strip()
+    if stats is not None:
+        stats.fences_stripped += 1
+    return match.group(1).strip()
+
+
+def _strip_emphasis(text):
+    return text.strip().strip("*_`").strip()
+
+
+def _split_strings(text):
+    """Split `text` into (is_string, chunk) parts; single-quoted strings come back double-quoted."""
+    parts, outside, i = [], [], 0
+    while i < len(text):
+        quote = text[i]
+        if quote not in "\"'":
+            outside.append(quote)
+            i += 1
+            continue
+
+        parts.append((False, "".join(outside)))
+        outside = []
+        chars, i = [], i + 1
+        while i < len(text) and text[i] != quote:
+            if text[i] == "\\" and i + 1 < len(text):
+                escaped = text[i + 1]
+                chars.append(escaped if quote == "'" and escaped == "'" else text[i:i + 2])
+                i += 2
+                continue
+            # A double quote inside a single-quoted string must be escaped once requoted
+            chars.append('\\"' if text[i] == '"' else text[i])
+            i += 1
+        i += 1  # closing quote; an unterminated string is closed at the end
+        parts.append((True, '"' + "".join(chars) + '"'))
+    parts.append((False, "".join(outside)))
+    return parts
+
+
+def _repair_outside_strings(chunk):
+    chunk = re.sub(r",\s*([}\]])", r"\1", chunk)
+    chunk = re.sub(r"\bTrue\b", "true", chunk)
+    chunk = re.sub(r"\bFalse\b", "false", chunk)
+    chunk = re.sub(r"\bNone\b", "null", chunk)
+    return re.sub(r'([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)(\s*:)', r'\1"\2"\3', chunk)
+
+
+def _repair_json(candidate):
+    # Trailing commas, Python-style quotes/literals and unclosed braces are the
+    # usual ways an LLM breaks otherwise valid JSON. Repairs only touch text
+    # outside string literals, so quotes may be mixed within one object.
+    parts = _split_strings(candidate)
+    repaired = "".join(chunk if is_string else _repair_outside_strings(chunk) for is_string, chunk in parts)
+
+    structure = "".join(chunk for is_string, chunk in parts if not is_string)
+    repaired += "]" * max(0, structure.count("[") - structure.count("]"))
+    repaired += "}" * max(0, structure.count("{") - structure.count("}"))
+    return json.loads(repaired)
+
+
+def extract_json(text, stats=None):
+    """Return the first JSON object in `text`, repairing it if needed, or raise ValueError."""
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found")
+
+    end = text.rfind("}")
+    candidate = text[start:end + 1] if end > start else text[start:]
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        result = _repair_json(candidate)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Unrecoverable JSON: {e}") from e
+
+    if stats is not None:
+        stats.json_repaired += 1
+    return result
+
+
+# ================== PARSERS ==================
+def parse_executor_response(text, stats=PARSE_STATS, allow_tools=True):
+    """
+    Classify an executor reply as a final answer, a tool request or invalid.
+
+    Tolerates markdown fences, leading whitespace/formatting around the
+    FINAL ANSWER marker (in any case), slightly broken JSON, and the
+    `{"final_answer": ...}` shape produced in JSON response mode. Agents
+    without tools pass `allow_tools=False`, which makes a tool request
+    invalid (and counted as a format failure).
+    """
+    raw = text or ""
+    body = strip_fences(raw, stats)
+
+    marker = FINAL_ANSWER_RE.search(body)
+    if marker and not body[:marker.start()].strip().startswith("{"):
+        stats.parsed += 1
+        return ParsedResponse("final", raw, answer=_strip_emphasis(body[marker.end():]))
+
+    try:
+        payload = extract_json(body, stats)
+    except ValueError as e:
+        stats.format_failures += 1
+        return ParsedResponse("invalid", raw, error=str(e))
+
+    if isinstance(payload, dict):
+        if payload.get("final_answer") is not None:
+            stats.parsed += 1
+            return ParsedResponse("final", raw, answer=str(payload["final_answer"]).strip())
+        if payload.get("action") and not allow_tools:
+            stats.format_failures += 1
+            return ParsedResponse("invalid", raw, error="Tool requests are not available to this agent")
+        if payload.get("action"):
+            stats.parsed += 1
+            return ParsedResponse("tool", raw, action=str(payload["action"]).strip(), input=payload.get("input"))
+
+    stats.format_failures += 1
+    return ParsedResponse("invalid", raw, error="JSON object has neither 'action' nor 'final_answer'")
+
+
+def parse_verdict(text):
+    """Interpret a critic reply. Anything that is not a clear PASS counts as a critique."""
+    raw = text or ""
+    body = strip_fences(raw)
+
+    match = VERDICT_RE.match(body)
+    if not match:
+        return Verdict(passed=False, critique=body, confident=False, raw=raw)
+
+    if match.group(1).lower() == "pass":
+        return Verdict(passed=True, critique="", raw=raw)
+    return Verdict(passed=False, critique=body[match.end():].strip() or body, raw=raw)
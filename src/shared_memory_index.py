@@ -0,0 +1,199 @@
+import fcntl
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+# ---- Segment layout ----
+# [header | vectors: capacity x dim float32 | entries: capacity x (start, end, ts) | blob]
+# A blob record is "<topic>\0<content>" in UTF-8. `count` is written last, so readers
+# never see an entry whose vector, metadata or text is still being written.
+MAGIC = b"AGMEMIX1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQ")  # magic, version, dim, capacity, blob_capacity, count, blob_used
+HEADER_SIZE = 64
+COUNT_POS = 32
+BLOB_USED_POS = 40
+ENTRY = struct.Struct("<QQq")  # blob start, blob end, timestamp (ns)
+
+
+class SegmentFull(RuntimeError):
+    pass
+
+
+class SharedMemoryIndex:
+    """
+    Memory index shared by every worker process on a box through one mmap'd file.
+
+    Each process maps the same file, so the vectors are read in place (zero
+    copies, one copy in the page cache however many workers there are).
+    Appends are serialized by an exclusive flock, which makes the segment
+    single-writer at any moment while any worker may learn new memories;
+    searches never take the lock. A reader re-reads the published entry
+    count at most every `max_staleness` seconds, which bounds how long
+    another worker's append stays invisible.
+
+    Exposes the subset of the FAISS index and MemoryStore APIs agent_8 uses
+    (`search`, `ntotal`, `content`, `with_topic`, indexing, `len`). Vectors
+    are stored as unit-normalized float32 and searched by brute-force inner
+    product, like IndexFlatIP. Capacity is fixed when the segment is created;
+    appends past it raise SegmentFull. Workers that start together seed the
+    segment with `append_if_empty`, which checks and writes under the lock.
+    """
+
+    def __init__(self, path, dimension, capacity=100_000, blob_capacity=None, max_staleness=0.5,
+                 writable=True):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.writable = writable
+
+        flags = os.O_RDWR | os.O_CREAT if writable else os.O_RDONLY
+        self._fd = os.open(path, flags, 0o644)
+        if writable:
+            with self._locked():
+                if os.fstat(self._fd).st_size == 0:
+                    self._create(dimension, capacity, blob_capacity or capacity * 512)
+
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self._mm = mmap.mmap(self._fd, 0, access=access)
+
+        magic, version, dim, cap, blob_cap, _, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a shared memory segment")
+        if dim != dimension:
+            raise ValueError(f"{path} holds {dim}-d vectors, expected {dimension}")
+
+        self.dimension = dim
+        self.capacity = cap
+        self.blob_capacity = blob_cap
+        self._entries_offset = HEADER_SIZE + cap * dim * 4
+        self._blob_offset = self._entries_offset + cap * ENTRY.size
+
+        # Zero-copy view over the vector region of the mapping
+        self._vectors = np.frombuffer(self._mm, dtype=np.float32, count=cap * dim, offset=HEADER_SIZE)
+        self._vectors = self._vectors.reshape(cap, dim)
+
+        self._count = 0
+        self._refreshed_at = float("-inf")
+        self.refresh()
+
+    def _create(self, dimension, capacity, blob_capacity):
+        size = HEADER_SIZE + capacity * (dimension * 4 + ENTRY.size) + blob_capacity
+        os.ftruncate(self._fd, size)
+        header = HEADER.pack(MAGIC, VERSION, dimension, capacity, blob_capacity, 0, 0)
+        os.pwrite(self._fd, header.ljust(HEADER_SIZE, b"\0"), 0)
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # ---- visibility ----
+    def refresh(self):
+        """Pick up entries published by other processes; returns how many are visible."""
+        (self._count,) = struct.unpack_from("<Q", self._mm, COUNT_POS)
+        self._refreshed_at = time.monotonic()
+        return self._count
+
+    def _visible_count(self):
+        if time.monotonic() - self._refreshed_at >= self.max_staleness:
+            self.refresh()
+        return self._count
+
+    # ---- writes ----
+    def _append_locked(self, vector, content, topic):
+        record = topic.encode("utf-8") + b"\0" + content.encode("utf-8")
+        count, blob_used = struct.unpack_from("<QQ", self._mm, COUNT_POS)
+        if count >= self.capacity or blob_used + len(record) > self.blob_capacity:
+            raise SegmentFull(f"Shared memory segment {self.path} is full")
+
+        start = self._blob_offset + blob_used
+        self._mm[start:start + len(record)] = record
+        ENTRY.pack_into(self._mm, self._entries_offset + count * ENTRY.size,
+                        blob_used, blob_used + len(record), time.time_ns())
+        self._vectors[count] = vector
+
+        # Publish: blob_used first, then count
+        struct.pack_into("<Q", self._mm, BLOB_USED_POS, blob_used + len(record))
+        struct.pack_into("<Q", self._mm, COUNT_POS, count + 1)
+        self._count = count + 1
+        return count
+
+    def append(self, vector, content, topic="general"):
+        if not self.writable:
+            raise PermissionError(f"{self.path} was opened read-only")
+        with self._locked():
+            return self._append_locked(vector, content, topic)
+
+    def append_if_empty(self, items):
+        """Append (vector, content, topic) items only if the segment is still empty; True if written."""
+        if not self.writable:
+            raise PermissionError(f"{self.path} was opened read-only")
+        with self._locked():
+            if struct.unpack_from("<Q", self._mm, COUNT_POS)[0]:
+                self.refresh()
+                return False
+            for vector, content, topic in items:
+                self._append_locked(vector, content, topic)
+        return True
+
+    # ---- FAISS-style search ----
+    @property
+    def ntotal(self):
+        return self._visible_count()
+
+    def search(self, queries, k):
+        n = self._visible_count()
+        queries = np.asarray(queries, dtype=np.float32)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if n == 0:
+            return scores, ids
+
+        similarities = queries @ self._vectors[:n].T
+        top = min(k, n)
+        for row, sims in enumerate(similarities):
+            best = np.argpartition(-sims, top - 1)[:top]
+            best = best[np.argsort(-sims[best])]
+            scores[row, :top] = sims[best]
+            ids[row, :top] = best
+        return scores, ids
+
+    # ---- MemoryStore-style metadata ----
+    def _record(self, i):
+        start, end, timestamp_ns = ENTRY.unpack_from(self._mm, self._entries_offset + i * ENTRY.size)
+        topic, _, content = self._mm[self._blob_offset + start:self._blob_offset + end].partition(b"\0")
+        return topic.decode("utf-8"), content.decode("utf-8"), timestamp_ns
+
+    def content(self, i):
+        return self._record(i)[1]
+
+    def topic(self, i):
+        return self._record(i)[0]
+
+    def with_topic(self, topic):
+        return [self[i] for i in range(len(self)) if self.topic(i) == topic]
+
+    def __getitem__(self, i):
+        n = self._visible_count()
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("memory index out of range")
+        topic, content, timestamp_ns = self._record(i)
+        return {"content": content, "topic": topic, "timestamp": str(datetime.fromtimestamp(timestamp_ns / 1e9))}
+
+    def __len__(self):
+        return self._visible_count()
+
+    def close(self):
+        del self._vectors
+        self._mm.close()
+        os.close(self._fd)
@@ -0,0 +1,94 @@
+from collections import deque
+
+from prompt_builder import count_tokens, truncate_to_tokens
+
+SUMMARY_TOKENS = 150  # cap for the rolling summary of evicted steps
+ENTRY_SHARE = 0.5  # no single step may take more than this share of the block
+MIN_ENTRY_TOKENS = 20  # below this, a step that does not fit is skipped rather than cut
+
+
+def extractive_summary(summary, step, output, max_tokens=SUMMARY_TOKENS):
+    """Cheap local summarizer: keep the first sentence of each evicted step."""
+    first = " ".join(output.split()).split(". ")[0].rstrip(".")
+    line = f"{step.strip()} -> {first}."
+    merged = f"{summary}\n{line}" if summary else line
+
+    # Keep the most recent part when the summary outgrows its cap
+    while count_tokens(merged) > max_tokens and "\n" in merged:
+        merged = merged.split("\n", 1)[1]
+    return truncate_to_tokens(merged, max_tokens)
+
+
+class ShortTermMemory:
+    """
+    Ring buffer of the last `max_items` (step, output) pairs of a run.
+
+    `render()` returns the block that goes into the next executor prompt,
+    newest entries first until `max_tokens` is reached. An entry longer than
+    its share of the block is truncated, and one that no longer fits is
+    skipped, so a single long answer cannot crowd out the rest. Entries
+    pushed out of the buffer are folded into a rolling summary when
+    `summarize` is set. Callers report each prompt that actually carried the
+    block with `record_sent()`.
+    """
+
+    def __init__(self, max_items=5, max_tokens=600, summarize=extractive_summary):
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self._entries = deque(maxlen=max_items)
+        self.summary = ""
+
+        self.renders = 0
+        self.prompts = 0
+        self.tokens_added = 0
+        self.evictions = 0
+
+    def add(self, step, output):
+        if len(self._entries) == self._entries.maxlen:
+            old_step, old_output = self._entries[0]
+            self.evictions += 1
+            if self.summarize:
+                self.summary = self.summarize(self.summary, old_step, old_output)
+        self._entries.append((step.strip(), output.strip()))
+
+    def render(self):
+        blocks = []
+        used = 0
+
+        for step, output in reversed(self._entries):
+            block = f"[{step}]\n{output}"
+            room = min(self.max_tokens - used, int(self.max_tokens * ENTRY_SHARE))
+            if count_tokens(block) > room:
+                if room < MIN_ENTRY_TOKENS:
+                    continue
+                block = truncate_to_tokens(block, room)
+            blocks.append(block)
+            used += count_tokens(block)
+
+        if self.summary and used + count_tokens(self.summary) <= self.max_tokens:
+            blocks.append(f"[Earlier steps]\n{self.summary}")
+
+        self.renders += 1
+        return "\n\n".join(reversed(blocks))
+
+    def record_sent(self, text):
+        """Count a prompt that carried `text` (a `render()` result)."""
+        self.prompts += 1
+        self.tokens_added += count_tokens(text)
+
+    def clear(self):
+        self._entries.clear()
+        self.summary = ""
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "renders": self.renders,
+            "prompts": self.prompts,
+            "tokens_added": self.tokens_added,
+            "avg_tokens_per_prompt": round(self.tokens_added / self.prompts, 1) if self.prompts else 0,
+        }
@@ -0,0 +1,182 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# JSON-schema type names -> Python types accepted for a tool input
+SCHEMA_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+# ================== TOOL ==================
+@dataclass
+class Tool:
+    name: str
+    func: Callable[..., Any]
+    description: str
+    input_schema: dict
+    pure: bool = False  # pure tools always return the same result for the same input
+
+    def validate(self, tool_input):
+        expected = self.input_schema.get("type", "string")
+        if not isinstance(tool_input, SCHEMA_TYPES[expected]) or (
+            expected in ("number", "integer") and isinstance(tool_input, bool)
+        ):
+            raise TypeError(
+                f"Tool '{self.name}' expects input of type '{expected}', "
+                f"got {type(tool_input).__name__}"
+            )
+
+        if expected == "object":
+            missing = [k for k in self.input_schema.get("required", []) if k not in tool_input]
+            if missing:
+                raise ValueError(f"Tool '{self.name}' is missing required fields: {missing}")
+
+
+# ================== RESULT CACHE ==================
+class ToolResultCache:
+    """LRU cache with a per-entry TTL for results of pure tools."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(tool_name, tool_input):
+        return tool_name, json.dumps(tool_input, sort_keys=True, default=str)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+
+        expires_at, result = entry
+        if self.ttl_seconds is not None and self._clock() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None, False
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result, True
+
+    def put(self, key, result):
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds is not None else None
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+
+# ================== REGISTRY ==================
+class ToolRegistry:
+    """
+    Name -> Tool mapping used by the agents.
+
+    Behaves like the old TOOLS dict for lookups (`name in TOOLS`, `TOOLS.keys()`,
+    `TOOLS[name](x)` calls the raw function), but the agents call through
+    `call()` so inputs are validated against the tool's schema and results of
+    pure tools are served from a shared cache. `tool(name)` returns the Tool.
+    """
+
+    def __init__(self, cache: Optional[ToolResultCache] = None):
+        self._tools = {}
+        self.cache = cache if cache is not None else ToolResultCache()
+
+    def register(self, name, func, description, input_schema=None, pure=False):
+        self._tools[name] = Tool(
+            name=name,
+            func=func,
+            description=description,
+            input_schema=input_schema or {"type": "string"},
+            pure=pure,
+        )
+        return func
+
+    def call(self, name, tool_input):
+        tool = self._tools[name]
+        tool.validate(tool_input)
+
+        if not tool.pure:
+            return tool.func(tool_input)
+
+        key = self.cache.make_key(name, tool_input)
+        result, hit = self.cache.get(key)
+        if hit:
+            return result
+
+        # Failures are not cached, so a retry with the same input re-raises for real
+        result = tool.func(tool_input)
+        self.cache.put(key, result)
+        return result
+
+    def describe(self):
+        """Tool section for a system prompt, generated from the registered schemas."""
+        lines = []
+        for i, tool in enumerate(self._tools.values(), start=1):
+            schema = tool.input_schema
+            lines.append(f"{i}. {tool.name}")
+            lines.append(f"   - description: {tool.description}")
+            lines.append(f"   - input: {schema.get('description', schema.get('type', 'string'))}")
+            lines.append("")
+        return "\n".join(lines).rstrip()
+
+    def stats(self):
+        return self.cache.stats()
+
+    def keys(self):
+        return self._tools.keys()
+
+    def tool(self, name):
+        return self._tools[name]
+
+    def __getitem__(self, name):
+        return self._tools[name].func
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def __iter__(self):
+        return iter(self._tools)
+
+    def __len__(self):
+        return len(self._tools)
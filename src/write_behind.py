@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+
+
+class WriteBehindQueue:
+    """
+    Buffers items and hands them to `flush_fn` in batches on a background thread.
+
+    A batch is written when `batch_size` items are waiting, when
+    `flush_interval` seconds have passed since the oldest one was queued, or
+    when `flush()`/`close()` is called. `flush()` blocks until everything
+    submitted so far has been written, which is how callers get
+    read-your-writes when they need it.
+    """
+
+    def __init__(self, flush_fn, batch_size=16, flush_interval=2.0, name="write-behind"):
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._pending = []
+        self._queued_at = deque()  # enqueue time of each pending item, oldest first
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindQueue is closed")
+            first = not self._pending
+            self._pending.append(item)
+            self._queued_at.append(time.monotonic())
+            self.submitted += 1
+            # Wake the worker to start the interval timer, or because a batch is full
+            if first or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def pending(self):
+        """Items submitted but not yet written, oldest first."""
+        with self._cond:
+            return list(self._pending)
+
+    def flush(self, timeout=None):
+        with self._cond:
+            target = self.submitted
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self.written + self.failed >= target, timeout)
+
+    def close(self, timeout=None):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _batch_ready(self):
+        if self._closed or self._flush_requested:
+            return True
+        if len(self._pending) >= self.batch_size:
+            return True
+        return bool(self._pending) and time.monotonic() - self._queued_at[0] >= self.flush_interval
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._batch_ready():
+                    wait = None
+                    if self._pending:
+                        wait = max(0.0, self.flush_interval - (time.monotonic() - self._queued_at[0]))
+                    self._cond.wait(wait)
+
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                for _ in batch:
+                    self._queued_at.popleft()
+                if not self._pending:
+                    self._flush_requested = False
+                stop = self._closed and not self._pending and not batch
+
+            if stop:
+                return
+            if not batch:
+                continue
+
+            try:
+                self.flush_fn(batch)
+                ok = True
+            except Exception as e:
+                print(f"⚠️ Write-behind batch of {len(batch)} failed: {e}")
+                ok = False
+
+            with self._cond:
+                self.batches += 1
+                if ok:
+                    self.written += len(batch)
+                else:
+                    self.failed += len(batch)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "submitted": self.submitted,
+                "written": self.written,
+                "failed": self.failed,
+                "pending": len(self._pending),
+                "batches": self.batches,
+            }
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from checkpoint import CheckpointStore
+
+
+@pytest.mark.parametrize("run_id", ["../escape", "a/b", "", "x" * 65, "run.json", None])
+def test_unsafe_run_ids_are_rejected(tmp_path, run_id):
+    store = CheckpointStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.load(run_id)
+
+
+def test_finish_keeps_stopped_runs_and_drops_done_ones(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+
+    stopped = store.start("goal", "stopped-run")
+    stopped.status = "stopped"
+    store.finish(stopped)
+    done = store.start("goal", "done-run")
+    done.status = "done"
+    store.finish(done)
+
+    assert store.load("stopped-run").status == "stopped"
+    assert store.load("done-run") is None
+    assert os.listdir(tmp_path) == ["stopped-run.json"]
+
+
+def test_from_env_can_disable_checkpoints(monkeypatch):
+    import checkpoint
+
+    monkeypatch.setattr(checkpoint, "CHECKPOINTS_ENABLED", False)
+    assert CheckpointStore.from_env() is None
@@ -0,0 +1,43 @@
+import numpy as np
+
+from compact_memory import MemoryStore, _decode, int8_range
+
+
+def unit_vectors(n, dimension=384, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dimension)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_int8_range_beats_the_full_unit_range():
+    vectors = unit_vectors(2000)
+    full = (-np.ones(384, dtype="float32"), np.ones(384, dtype="float32"))
+
+    queries = unit_vectors(50, seed=1)
+    exact = queries @ vectors.T
+
+    clamped_error = np.abs(queries @ _decode(vectors, "int8").T - exact).mean()
+    full_error = np.abs(queries @ _decode(vectors, "int8", *full).T - exact).mean()
+
+    assert clamped_error < full_error / 3
+
+
+def test_sample_widens_the_int8_range():
+    sample = np.zeros((1, 400), dtype="float32")
+    sample[0, 2] = 0.9
+
+    lo, hi = int8_range(400, sample)
+
+    assert hi[2] == np.float32(0.9)
+    assert hi[0] == np.float32(0.2)  # 4 / sqrt(400)
+    assert lo[2] == np.float32(-0.2)
+
+
+def test_memory_store_round_trip():
+    store = MemoryStore()
+    first = store.append("hello", "greeting")
+    store.append("vectors", "vector_databases")
+
+    assert first == 0
+    assert store.content(1) == "vectors"
+    assert store[0]["topic"] == "greeting"
+    assert [m["content"] for m in store.with_topic("vector_databases")] == ["vectors"]
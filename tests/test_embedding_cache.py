@@ -0,0 +1,101 @@
+import threading
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+class Encoder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+
+def test_vectors_are_normalized_and_repeats_are_memory_hits():
+    encoder = Encoder()
+    cache = EmbeddingCache("model", encoder)
+
+    first = cache.embed("hello")
+    again = cache.embed("hello")
+
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert again is first
+    assert encoder.batches == [["hello"]]
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_text_repeated_within_a_batch_is_one_miss():
+    encoder = Encoder()
+    cache = EmbeddingCache("model", encoder)
+
+    vectors = cache.embed_many(["y", "y", "z"])
+
+    assert encoder.batches == [["y", "z"]]
+    assert vectors[0] is vectors[1]
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"]) == (2, 1)
+
+
+def test_least_recently_used_vector_is_evicted():
+    encoder = Encoder()
+    cache = EmbeddingCache("model", encoder, capacity=2)
+
+    cache.embed_many(["a", "b"])
+    cache.embed("a")  # "b" is now the least recently used
+    cache.embed("c")
+    cache.embed("b")
+
+    assert encoder.batches == [["a", "b"], ["c"], ["b"]]
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_is_shared_across_instances_of_the_same_model(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    first = EmbeddingCache("model", Encoder(), path=path)
+    vector = first.embed("seed memory")
+    first.close()
+
+    encoder = Encoder()
+    second = EmbeddingCache("model", encoder, path=path)
+    assert np.array_equal(second.embed("seed memory"), vector)
+    assert encoder.batches == []
+    assert second.stats()["disk_hits"] == 1
+    second.close()
+
+    # Another model must not reuse those vectors
+    other_encoder = Encoder()
+    other = EmbeddingCache("other-model", other_encoder, path=path)
+    other.embed("seed memory")
+    assert other_encoder.batches == [["seed memory"]]
+    other.close()
+
+
+def test_lookups_do_not_wait_for_a_slow_encode():
+    started, release = threading.Event(), threading.Event()
+
+    def encode(texts):
+        if "slow batch" in texts:
+            started.set()
+            release.wait(5)
+        return np.ones((len(texts), 3), dtype=np.float32)
+
+    cache = EmbeddingCache("model", encode)
+    cache.embed("goal")
+
+    writer = threading.Thread(target=cache.embed, args=("slow batch",))
+    writer.start()
+    assert started.wait(5)
+
+    # The encode above is still running; a cached lookup must not block on it
+    lookup = threading.Thread(target=cache.embed, args=("goal",))
+    lookup.start()
+    lookup.join(1)
+    assert not lookup.is_alive()
+
+    release.set()
+    writer.join(5)
+    assert cache.stats()["hit_rate"] == round(1 / 3, 3)
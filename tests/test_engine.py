@@ -0,0 +1,209 @@
+import functools
+import types
+
+import pytest
+
+import llm_stub
+from budget import RunBudget
+from checkpoint import CheckpointStore
+from engine import Critic, Engine, EnginePolicy, Executor, Planner, SessionExecutor, from_model, from_router
+from model_router import MODEL, ModelRouter
+from response_parser import parse_executor_response
+
+
+def scripted(*replies):
+    """Responder that plays `replies` in order, then repeats the last one."""
+    replies = list(replies)
+
+    def respond(prompt, system_instruction):
+        return replies.pop(0) if len(replies) > 1 else replies[0]
+
+    return respond
+
+
+def make_engine(executor_replies=("FINAL ANSWER: done",), critic_replies=("PASS",), checkpoints=None,
+                max_retries=3):
+    planner = llm_stub.GenerativeModel(system_instruction="You are a planning agent.")
+    executor = llm_stub.GenerativeModel(responder=scripted(*executor_replies))
+    critic = llm_stub.GenerativeModel(responder=scripted(*critic_replies))
+    engine = Engine(
+        Planner(from_model(planner)),
+        Executor(from_model(executor), parse=parse_executor_response),
+        Critic(from_model(critic)),
+        policy=EnginePolicy(max_retries=max_retries, failed_output=lambda state: "failed", verbose=False),
+        checkpoints=checkpoints,
+    )
+    return engine, planner, executor, critic
+
+
+def test_critique_is_fed_back_and_the_step_retried():
+    engine, _, executor, critic = make_engine(
+        executor_replies=("FINAL ANSWER: first", "FINAL ANSWER: second"),
+        critic_replies=("CRITIQUE:\n- too vague", "PASS"),
+    )
+
+    run = engine.run("goal", budget=RunBudget())
+
+    assert run.outputs == ["second", "second", "second"]
+    assert run.passed == 3
+    assert executor.calls == 4
+    assert critic.calls == 4
+
+
+def test_step_fails_after_max_retries():
+    engine, _, executor, _ = make_engine(critic_replies=("CRITIQUE:\n- wrong",), max_retries=2)
+
+    run = engine.run("goal", budget=RunBudget())
+
+    assert run.outputs == ["failed"] * 3
+    assert run.failed == 3
+    assert executor.calls == 6
+
+
+def test_invalid_reply_is_retried_with_feedback():
+    engine, _, executor, _ = make_engine(executor_replies=("no protocol here", "FINAL ANSWER: ok"))
+
+    run = engine.run("goal", budget=RunBudget())
+
+    assert run.outputs[0] == "ok"
+    assert executor.calls == 4
+
+
+def test_budget_keeps_unreviewed_answer_and_stops():
+    engine, _, executor, critic = make_engine()
+
+    run = engine.run("goal", budget=RunBudget(max_calls=4))
+
+    assert run.stopped
+    assert run.budget.stop_reason == "call budget of 4 used"
+    assert run.outputs == ["done", "⚠️ Unreviewed: done", "⏹️ Stopped early: call budget of 4 used"]
+    assert executor.calls + critic.calls == 3
+
+
+def test_budget_refusing_the_planner_returns_no_steps():
+    engine, planner, _, _ = make_engine()
+
+    run = engine.run("goal", budget=RunBudget(max_calls=0))
+
+    assert planner.calls == 0
+    assert run.steps == []
+    assert run.outputs == ["⏹️ Stopped early: call budget of 0 used"]
+
+
+def test_resume_skips_completed_steps(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    engine, planner, executor, _ = make_engine(checkpoints=store)
+
+    first = engine.run("goal", run_id="run-1", budget=RunBudget(max_calls=4))
+    assert first.checkpoint.status == "stopped"
+    assert first.checkpoint.completed_steps() == 1
+
+    second = engine.run("goal", run_id="run-1", budget=RunBudget())
+
+    assert second.outputs == ["done", "done", "done"]
+    assert planner.calls == 1  # the stored plan is reused
+    assert executor.calls == 2 + 1  # step 2's saved answer is only reviewed, step 3 is executed
+    assert store.load("run-1") is None  # finished runs are not kept
+
+
+def test_finished_run_is_kept_when_asked(tmp_path):
+    store = CheckpointStore(str(tmp_path), keep_finished=True)
+    engine, *_ = make_engine(checkpoints=store)
+
+    engine.run("goal", run_id="run-1", budget=RunBudget())
+
+    assert store.load("run-1").status == "done"
+
+
+def make_routed_engine(critic_replies=("PASS",), use_chat=False):
+    executor_prompts = []
+    critic_responder = scripted(*critic_replies)
+
+    def respond(prompt, system_instruction):
+        if system_instruction == "critic":
+            return critic_responder(prompt, system_instruction)
+        if system_instruction == "executor":
+            executor_prompts.append(prompt)
+        return llm_stub.default_responder(prompt, system_instruction)
+
+    genai = types.SimpleNamespace(GenerativeModel=functools.partial(llm_stub.GenerativeModel, responder=respond))
+    router = ModelRouter(genai, {"planner": "You are a planning agent.", "executor": "executor", "critic": "critic"})
+    engine = Engine(
+        Planner(from_router(router, "planner")),
+        SessionExecutor(
+            lambda run, state: router.model_for("executor", state.step),
+            lambda run, state: [("GOAL", run.goal), ("STEP", state.step)],
+            use_chat=use_chat,
+        ),
+        Critic(from_router(router, "critic")),
+        policy=EnginePolicy(verbose=False),
+        router=router,
+    )
+    return engine, router, executor_prompts
+
+
+def test_calls_refused_by_the_budget_are_not_routed():
+    engine, router, executor_prompts = make_routed_engine()
+
+    engine.run("goal", budget=RunBudget(max_calls=1))
+
+    assert sum(router.calls.values()) == 1  # the planner only
+    assert executor_prompts == []
+
+
+def test_escalated_step_resends_the_full_prompt_on_a_new_chat():
+    engine, router, executor_prompts = make_routed_engine(
+        critic_replies=("CRITIQUE:\n- too vague", "PASS"), use_chat=True,
+    )
+
+    engine.run("goal", budget=RunBudget())
+
+    # The retry goes to the full model, whose chat has not seen the first attempt
+    assert router.calls[(MODEL, "executor")] == 1
+    assert "GOAL" in executor_prompts[1] and "too vague" in executor_prompts[1]
+
+
+def test_run_with_a_failed_step_keeps_its_checkpoint_and_resume_retries_only_it(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    # Step 1 is critiqued on all three attempts; later steps pass
+    engine, planner, executor, critic = make_engine(
+        critic_replies=("CRITIQUE: no", "CRITIQUE: no", "CRITIQUE: no", "PASS"),
+        checkpoints=store,
+    )
+
+    first = engine.run("goal", run_id="run-1", budget=RunBudget())
+    assert first.outputs == ["failed", "done", "done"]
+    assert first.failed == 1
+    assert store.load("run-1").status == "incomplete"
+
+    second = engine.run("goal", run_id="run-1", budget=RunBudget())
+    assert second.outputs == ["done", "done", "done"]
+    assert executor.calls == 5 + 1  # only the failed step runs again
+    assert store.load("run-1") is None
+
+
+def test_resumed_unreviewed_answer_goes_back_to_execution_when_critiqued(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    engine, _, executor, critic = make_engine(
+        critic_replies=("CRITIQUE: too short", "PASS"),
+        checkpoints=store,
+    )
+
+    first = engine.run("goal", run_id="run-1", budget=RunBudget(max_calls=2))
+    assert first.outputs[0] == "⚠️ Unreviewed: done"
+    assert store.load("run-1").unreviewed_output(0) == "done"
+
+    second = engine.run("goal", run_id="run-1", budget=RunBudget())
+    assert second.outputs == ["done", "done", "done"]
+    assert critic.calls == 1 + 3  # the saved answer, the retry, and steps 2 and 3
+    assert executor.calls == 1 + 3
+
+
+def test_resume_needs_checkpoints_and_a_known_run(tmp_path):
+    engine, *_ = make_engine()
+    with pytest.raises(ValueError, match="disabled"):
+        engine.resume("run-1")
+
+    engine, *_ = make_engine(checkpoints=CheckpointStore(str(tmp_path)))
+    with pytest.raises(ValueError, match="No checkpoint"):
+        engine.resume("run-1")
@@ -0,0 +1,69 @@
+import pytest
+
+from hybrid_retrieval import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_identifiers_and_drops_stopwords():
+    assert tokenize("What is error E-1042 in faiss.IndexFlatIP with gpt-4o?") == [
+        "error", "e-1042", "faiss.indexflatip", "gpt-4o",
+    ]
+
+
+def index_of(*texts):
+    index = BM25Index()
+    for doc_id, text in enumerate(texts):
+        index.add(doc_id, text)
+    return index
+
+
+def test_bm25_ranks_rare_and_repeated_terms_higher():
+    index = index_of(
+        "vector databases store embeddings",
+        "error E-1042 means the vector index is full",
+        "vector search and vector databases and vector math",
+        "planning agents break goals into steps",
+    )
+
+    ids = [doc_id for doc_id, _ in index.search("E-1042 vector", 10)]
+
+    assert ids[0] == 1  # the only document with the rare identifier
+    assert ids.index(2) < ids.index(0)  # "vector" three times beats once
+    assert 3 not in ids  # no shared term, no score
+
+
+def test_added_documents_are_searchable_without_a_rebuild():
+    index = index_of("vector databases")
+    assert index.search("E-1042", 5) == []
+
+    index.add(7, "error E-1042 in the vector index")
+
+    assert [doc_id for doc_id, _ in index.search("E-1042", 5)] == [7]
+    assert len(index) == 2
+
+
+def test_duplicate_ids_raise():
+    index = index_of("first")
+    with pytest.raises(ValueError):
+        index.add(0, "second")
+
+
+def test_reciprocal_rank_fusion_favours_ids_both_rankings_agree_on():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4, 1]])
+    assert fused[:2] == [1, 3]
+    assert set(fused) == {1, 2, 3, 4}
+    assert reciprocal_rank_fusion([[], [5]]) == [5]
+
+
+def test_strong_matches_drop_matches_on_common_words_only():
+    index = index_of(
+        "error E-1042 means the shared segment is full",
+        *[f"error number {i} in the agent" for i in range(9)],
+    )
+
+    # "error" is in every document and scores far below the identifier match
+    assert index.strong_matches("error E-1042", 10, min_score=1.0, relative_cutoff=0.5) == [0]
+    # The relative cutoff alone drops them too
+    assert index.strong_matches("error E-1042", 10, min_score=0.0, relative_cutoff=0.5) == [0]
+    # A query with only common words keeps nothing above the absolute floor
+    assert index.strong_matches("error", 10, min_score=1.0, relative_cutoff=0.5) == []
+    assert index.strong_matches("unrelated", 10, min_score=1.0, relative_cutoff=0.5) == []
@@ -0,0 +1,37 @@
+import llm_stub
+from llm_session import SessionStats, StepSession
+
+
+def test_chat_session_sends_only_the_delta_after_the_first_turn():
+    stats = SessionStats()
+    session = StepSession(llm_stub.GenerativeModel(), use_chat=True, stats=stats)
+
+    assert not session.wants_delta
+    session.send("full prompt")
+    assert session.wants_delta
+    session.send("feedback only")
+
+    assert stats.calls == 2
+    assert stats.delta_sends == 1
+    assert session.chat.history[::2] == ["full prompt", "feedback only"]
+
+
+def test_without_chat_every_send_is_a_full_prompt():
+    stats = SessionStats()
+    session = StepSession(llm_stub.GenerativeModel(), use_chat=False, stats=stats)
+    session.send("one")
+    session.send("two")
+
+    assert not session.wants_delta
+    assert stats.delta_sends == 0
+
+
+def test_chat_retries_are_billed_for_the_replayed_history():
+    stats = SessionStats()
+    session = StepSession(llm_stub.GenerativeModel(), use_chat=True, stats=stats)
+    session.send("full prompt with goal and step")
+    first = stats.prompt_tokens
+    session.send("feedback")
+
+    # The second turn pays for the first prompt and answer again
+    assert stats.prompt_tokens - first > first
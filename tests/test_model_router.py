@@ -0,0 +1,30 @@
+import llm_stub
+from model_router import LIGHT_MODEL, MODEL, ModelRouter
+
+PROMPTS = {"planner": "You are a planning agent.", "executor": "You are an execution agent.", "critic": "critic"}
+
+
+def test_escalation_rate_counts_only_executor_steps():
+    router = ModelRouter(llm_stub, PROMPTS)
+
+    router.start_step("goal", role="planner")
+    router.escalate("goal", "empty plan", role="planner")
+    for step in ("1. a", "2. b"):
+        router.start_step(step)
+        router.escalate(step, "critique")
+
+    stats = router.stats()
+    assert stats["escalations"] == 3
+    assert stats["escalation_rate"] == 1.0
+
+
+def test_escalated_step_moves_to_the_full_model_until_restarted():
+    router = ModelRouter(llm_stub, PROMPTS)
+    step = "1. short step"
+
+    router.start_step(step)
+    assert router.model_name("executor", step) == LIGHT_MODEL
+    router.escalate(step)
+    assert router.model_name("critic", step) == MODEL
+    router.start_step(step)
+    assert router.model_name("executor", step) == LIGHT_MODEL
@@ -0,0 +1,85 @@
+from prompt_builder import (
+    MIN_LATEST_TOKENS,
+    PromptStats,
+    build_prompt,
+    count_tokens,
+    render_observations,
+    truncate_to_tokens,
+)
+
+
+def test_count_tokens_splits_words_punctuation_and_long_words():
+    assert count_tokens("") == 0
+    assert count_tokens("Hi, you!") == 4
+    assert count_tokens("internationalization") == 5  # 20 characters in ~4-character pieces
+
+
+def test_truncate_to_tokens_fits_and_marks_the_cut():
+    text = "one two three four five six seven eight nine ten"
+    assert truncate_to_tokens(text, 100) == text
+
+    short = truncate_to_tokens(text, 5)
+    assert short.endswith(" …")
+    assert count_tokens(short) <= 5
+    assert text.startswith(short[:-2])
+
+
+def test_newest_observations_stay_verbatim_and_older_ones_are_summarized():
+    stats = PromptStats()
+    observations = ["Old result. With details.", "Middle result. More.", "Newer. Kept.", "Newest. Kept."]
+
+    block = render_observations(observations, 1000, stats=stats)
+
+    assert block.splitlines() == ["- Old result.", "- Middle result.", "- Newer. Kept.", "- Newest. Kept."]
+    assert stats.observations_compacted == 1
+    assert stats.observations_dropped == 0
+
+
+def test_compaction_is_counted_once_across_rebuilds():
+    stats = PromptStats()
+    observations = []
+    for i in range(5):
+        observations.append(f"Critique {i}. Details.")
+        render_observations(observations, 1000, stats=stats)
+
+    assert stats.observations_compacted == 3
+
+
+def test_oldest_observations_are_dropped_first():
+    stats = PromptStats()
+    observations = [f"observation number {i}" for i in range(10)]
+
+    block = render_observations(observations, 20, stats=stats)
+
+    assert block.splitlines()[-1] == "- observation number 9"
+    assert "observation number 0" not in block
+    assert stats.observations_dropped == 10 - len(block.splitlines())
+
+
+def test_latest_observation_survives_when_fixed_sections_use_the_budget():
+    stats = PromptStats()
+    critique = "CRITIQUE: the answer ignores the second half of the question " * 10
+
+    prompt = build_prompt([("GOAL", "word " * 200)], observations=["older", critique], budget_tokens=150,
+                          stats=stats)
+
+    observations = prompt.split("OBSERVATIONS:\n")[1]
+    assert observations.startswith("- CRITIQUE: the answer ignores")
+    assert count_tokens(observations) <= MIN_LATEST_TOKENS
+    assert stats.observations_dropped == 1
+
+
+def test_build_prompt_orders_sections_observations_and_footer():
+    stats = PromptStats()
+    prompt = build_prompt(
+        [("GOAL", "  Plan a trip\n\n\n\nto Rome  "), ("STEP", "Book flights")],
+        observations=[],
+        footer="Decide next action.",
+        stats=stats,
+    )
+
+    assert prompt == (
+        "GOAL:\nPlan a trip\n\nto Rome\n\nSTEP:\nBook flights\n\nOBSERVATIONS:\nNone\n\nDecide next action."
+    )
+    assert stats.calls == 1
+    assert stats.max_tokens == count_tokens(prompt)
@@ -0,0 +1,90 @@
+import pytest
+
+from response_parser import ParseStats, extract_json, parse_executor_response, parse_verdict, strip_fences
+
+
+@pytest.mark.parametrize("text, answer", [
+    ("FINAL ANSWER:\nParis", "Paris"),
+    ("**Final Answer**: Paris", "Paris"),
+    ("**FINAL ANSWER:** Paris", "Paris"),
+    ("## final answer - Paris", "Paris"),
+    ("Thinking done.\nFINAL ANSWER\nParis", "Paris"),
+    ("```\nFINAL ANSWER: Paris\n```", "Paris"),
+])
+def test_final_answer_markers(text, answer):
+    parsed = parse_executor_response(text, ParseStats())
+    assert parsed.is_final
+    assert parsed.answer == answer
+
+
+def test_prose_mentioning_a_final_answer_is_not_a_marker():
+    stats = ParseStats()
+    parsed = parse_executor_response("Final answer is unclear, let me use a tool", stats)
+    assert parsed.is_invalid
+    assert stats.format_failures == 1
+
+
+def test_fences_are_stripped_and_counted():
+    stats = ParseStats()
+    assert strip_fences('```json\n{"a": 1}\n```', stats) == '{"a": 1}'
+    assert strip_fences("plain", stats) == "plain"
+    assert stats.fences_stripped == 1
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"action": "calculator", "input": "2+2",}', {"action": "calculator", "input": "2+2"}),
+    ("{'action': 'calculator', 'input': '2+2'}", {"action": "calculator", "input": "2+2"}),
+    ("""{'action': 'word_count', 'input': "it's"}""", {"action": "word_count", "input": "it's"}),
+    ("""{'input': 'he said "no"'}""", {"input": 'he said "no"'}),
+    ("{action: 'calculator', pure: True, limit: None}", {"action": "calculator", "pure": True, "limit": None}),
+    ('{"input": "True or None, [x"', {"input": "True or None, [x"}),
+    ('Sure: {"action": "calculator", "input": "2+2"', {"action": "calculator", "input": "2+2"}),
+])
+def test_broken_json_is_repaired(text, expected):
+    stats = ParseStats()
+    assert extract_json(text, stats) == expected
+    assert stats.json_repaired == 1
+
+
+def test_unrecoverable_json_raises():
+    with pytest.raises(ValueError):
+        extract_json("{: :}")
+    with pytest.raises(ValueError):
+        extract_json("no json here")
+
+
+def test_json_mode_replies():
+    stats = ParseStats()
+    final = parse_executor_response('{"final_answer": "42"}', stats)
+    tool = parse_executor_response('{"action": " calculator ", "input": "6*7"}', stats)
+    empty = parse_executor_response('{"thoughts": "hmm"}', stats)
+
+    assert final.is_final and final.answer == "42"
+    assert tool.is_tool and tool.action == "calculator" and tool.input == "6*7"
+    assert empty.is_invalid
+    assert stats.as_dict() == {"parsed": 2, "fences_stripped": 0, "json_repaired": 0, "format_failures": 1}
+
+
+def test_tool_requests_are_invalid_for_agents_without_tools():
+    stats = ParseStats()
+    parsed = parse_executor_response('{"action": "calculator", "input": "2+2"}', stats, allow_tools=False)
+    assert parsed.is_invalid
+    assert stats.parsed == 0
+    assert stats.format_failures == 1
+
+
+@pytest.mark.parametrize("text, passed, confident", [
+    ("PASS", True, True),
+    ("**Pass.**", True, True),
+    ("CRITIQUE:\n- too vague", False, True),
+    ("Looks mostly fine", False, False),
+    ("PASSABLE but thin", False, False),
+])
+def test_verdicts(text, passed, confident):
+    verdict = parse_verdict(text)
+    assert verdict.passed is passed
+    assert verdict.confident is confident
+
+
+def test_critique_text_drops_the_marker():
+    assert parse_verdict("CRITIQUE:\n- too vague").critique == "- too vague"
@@ -0,0 +1,71 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from shared_memory_index import SegmentFull, SharedMemoryIndex
+
+DIMENSION = 8
+SEEDS = [("seed one", "a"), ("seed two", "b"), ("seed three", "c")]
+
+
+def unit(i):
+    vector = np.zeros(DIMENSION, dtype="float32")
+    vector[i % DIMENSION] = 1.0
+    return vector
+
+
+def seed_worker(path, barrier):
+    index = SharedMemoryIndex(path, DIMENSION, capacity=64)
+    barrier.wait()
+    index.append_if_empty([(unit(i), content, topic) for i, (content, topic) in enumerate(SEEDS)])
+
+
+def append_worker(path, worker, per_worker):
+    index = SharedMemoryIndex(path, DIMENSION, capacity=64)
+    for i in range(per_worker):
+        index.append(unit(i), f"worker {worker} memory {i}")
+
+
+def run_workers(target, args_list):
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=target, args=args) for args in args_list]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+
+def test_concurrent_workers_seed_once(tmp_path):
+    path = str(tmp_path / "segment")
+    barrier = multiprocessing.get_context("fork").Barrier(4)
+    run_workers(seed_worker, [(path, barrier)] * 4)
+
+    index = SharedMemoryIndex(path, DIMENSION)
+    assert [index.content(i) for i in range(len(index))] == [content for content, _ in SEEDS]
+
+
+def test_append_if_empty_skips_a_seeded_segment(tmp_path):
+    index = SharedMemoryIndex(str(tmp_path / "segment"), DIMENSION)
+    assert index.append_if_empty([(unit(0), "first", "a")])
+    assert not index.append_if_empty([(unit(1), "second", "b")])
+    assert len(index) == 1
+
+
+def test_concurrent_appends_are_all_kept(tmp_path):
+    path = str(tmp_path / "segment")
+    run_workers(append_worker, [(path, worker, 10) for worker in range(4)])
+
+    index = SharedMemoryIndex(path, DIMENSION)
+    contents = {index.content(i) for i in range(len(index))}
+    assert contents == {f"worker {w} memory {i}" for w in range(4) for i in range(10)}
+
+
+def test_full_segment_raises_segment_full(tmp_path):
+    index = SharedMemoryIndex(str(tmp_path / "segment"), DIMENSION, capacity=2)
+    index.append(unit(0), "one")
+    index.append(unit(1), "two")
+    with pytest.raises(SegmentFull):
+        index.append(unit(2), "three")
+    assert len(index) == 2
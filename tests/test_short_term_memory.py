@@ -0,0 +1,36 @@
+from prompt_builder import count_tokens
+from short_term_memory import ShortTermMemory
+
+
+def test_long_newest_entry_does_not_drop_the_window():
+    memory = ShortTermMemory(max_tokens=600)
+    memory.add("1. intro", "short answer one.")
+    memory.add("2. details", " ".join(["word"] * 700))
+
+    block = memory.render()
+
+    assert "short answer one." in block
+    assert "[2. details]" in block
+    assert count_tokens(block) <= 600
+
+
+def test_summary_survives_a_long_entry():
+    memory = ShortTermMemory(max_items=1, max_tokens=600)
+    memory.add("1. intro", "First answer. More text.")
+    memory.add("2. details", " ".join(["word"] * 700))
+
+    assert "[Earlier steps]" in memory.render()
+
+
+def test_tokens_are_counted_per_prompt_sent():
+    memory = ShortTermMemory()
+    memory.add("1. intro", "short answer one.")
+    block = memory.render()
+
+    memory.record_sent(block)
+    memory.record_sent(block)
+
+    stats = memory.stats()
+    assert stats["renders"] == 1
+    assert stats["prompts"] == 2
+    assert stats["tokens_added"] == 2 * count_tokens(block)
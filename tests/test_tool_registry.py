@@ -0,0 +1,112 @@
+import pytest
+
+from tool_registry import ToolRegistry, ToolResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting(result=None, fail=False):
+    def func(tool_input):
+        func.calls += 1
+        if fail:
+            raise RuntimeError("tool failed")
+        return result if result is not None else f"result for {tool_input}"
+
+    func.calls = 0
+    return func
+
+
+def test_pure_results_are_cached_and_impure_ones_are_not():
+    registry = ToolRegistry()
+    pure, impure = counting(), counting()
+    registry.register("pure", pure, "pure tool", pure=True)
+    registry.register("impure", impure, "impure tool")
+
+    for _ in range(3):
+        assert registry.call("pure", "x") == "result for x"
+        registry.call("impure", "x")
+
+    assert pure.calls == 1
+    assert impure.calls == 3
+    assert registry.stats()["hits"] == 2
+    assert registry.stats()["misses"] == 1
+    assert registry.stats()["hit_rate"] == round(2 / 3, 3)
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    registry = ToolRegistry(ToolResultCache(ttl_seconds=10, clock=clock))
+    func = counting()
+    registry.register("tool", func, "tool", pure=True)
+
+    registry.call("tool", "x")
+    clock.now = 9.9
+    registry.call("tool", "x")
+    clock.now = 10.0
+    registry.call("tool", "x")
+
+    assert func.calls == 2
+    assert registry.cache.expirations == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ToolResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") == (None, False)
+    assert cache.get("a") == (1, True)
+    assert cache.get("c") == (3, True)
+    assert cache.evictions == 1
+
+
+def test_errors_are_not_cached():
+    registry = ToolRegistry()
+    func = counting(fail=True)
+    registry.register("tool", func, "tool", pure=True)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            registry.call("tool", "x")
+
+    assert func.calls == 2
+    assert len(registry.cache) == 0
+
+
+def test_inputs_are_validated_against_the_schema():
+    registry = ToolRegistry()
+    func = counting()
+    registry.register("text", func, "text tool")
+    registry.register("count", func, "count tool", input_schema={"type": "integer"})
+    registry.register(
+        "lookup", func, "lookup tool", input_schema={"type": "object", "required": ["key"]}
+    )
+
+    with pytest.raises(TypeError):
+        registry.call("text", 3)
+    with pytest.raises(TypeError):
+        registry.call("count", True)  # bool is not an integer input
+    with pytest.raises(ValueError):
+        registry.call("lookup", {"other": 1})
+    assert func.calls == 0
+
+    registry.call("lookup", {"key": "a"})
+    assert func.calls == 1
+
+
+def test_registry_lookups_behave_like_the_old_dict():
+    registry = ToolRegistry()
+    func = counting()
+    registry.register("tool", func, "tool")
+
+    assert "tool" in registry and list(registry.keys()) == ["tool"]
+    assert registry["tool"] is func
+    assert registry.tool("tool").description == "tool"
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from write_behind import WriteBehindQueue
+
+
+class Recorder:
+    def __init__(self, fail_on=None, delay=0.0):
+        self.batches = []
+        self.written_at = {}
+        self.fail_on = fail_on
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        time.sleep(self.delay)
+        if self.fail_on is not None and self.fail_on in batch:
+            raise RuntimeError("store unavailable")
+        with self.lock:
+            self.batches.append(list(batch))
+            for item in batch:
+                self.written_at[item] = time.monotonic()
+
+    def items(self):
+        with self.lock:
+            return [item for batch in self.batches for item in batch]
+
+
+def test_full_batches_are_written_without_waiting():
+    recorder = Recorder()
+    queue = WriteBehindQueue(recorder, batch_size=4, flush_interval=60)
+    for i in range(8):
+        queue.submit(i)
+    assert queue.flush(timeout=5)
+    assert recorder.items() == list(range(8))
+    queue.close()
+
+
+def test_flush_blocks_until_concurrent_submits_are_written():
+    recorder = Recorder(delay=0.01)
+    queue = WriteBehindQueue(recorder, batch_size=5, flush_interval=60)
+
+    def producer(start):
+        for i in range(start, start + 25):
+            queue.submit(i)
+
+    producers = [threading.Thread(target=producer, args=(n * 100,)) for n in range(4)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+
+    # Read-your-writes: after flush() returns everything submitted is visible
+    assert queue.flush(timeout=5)
+    assert sorted(recorder.items()) == sorted(n * 100 + i for n in range(4) for i in range(25))
+    assert queue.pending() == []
+    queue.close()
+
+
+def test_close_drains_pending_items():
+    recorder = Recorder()
+    queue = WriteBehindQueue(recorder, batch_size=100, flush_interval=60)
+    for i in range(10):
+        queue.submit(i)
+    queue.close(timeout=5)
+    assert recorder.items() == list(range(10))
+    assert queue.stats()["pending"] == 0
+
+
+def test_items_left_after_a_partial_batch_keep_their_enqueue_time():
+    interval = 0.2
+    release = threading.Event()
+    recorder = Recorder()
+
+    def flush_fn(batch):
+        if 0 in batch:
+            release.wait(5)
+        recorder(batch)
+
+    queue = WriteBehindQueue(flush_fn, batch_size=2, flush_interval=interval)
+    queue.submit(0)
+    queue.submit(1)  # full batch; the worker blocks writing it
+
+    submitted_at = time.monotonic()
+    for i in (2, 3, 4):
+        queue.submit(i)
+    time.sleep(interval * 1.5)
+    release.set()
+
+    # [2, 3] goes out as a full batch; 4 has already waited past the interval
+    # so it must follow straight away rather than start a fresh timer
+    deadline = time.monotonic() + 5
+    while 4 not in recorder.written_at and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert recorder.batches[:2] == [[0, 1], [2, 3]]
+    assert recorder.written_at[4] - submitted_at < interval * 2
+    queue.close()
+
+
+def test_failed_batches_are_counted_and_do_not_block_flush():
+    recorder = Recorder(fail_on=1)
+    queue = WriteBehindQueue(recorder, batch_size=2, flush_interval=60)
+    for i in range(4):
+        queue.submit(i)
+    assert queue.flush(timeout=5)
+
+    stats = queue.stats()
+    assert stats["submitted"] == 4
+    assert stats["written"] == 2
+    assert stats["failed"] == 2
+    assert recorder.items() == [2, 3]
+    queue.close()